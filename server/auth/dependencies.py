@@ -0,0 +1,241 @@
+import hmac
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import jwt
+from fastapi import Header, HTTPException, Request
+from pymongo import ReturnDocument
+
+from database.database import User, Specialties
+from database.aio import run_db
+from auth.identity import ROLE_USER, resolve_identity
+from auth.revocations import revocations
+
+logger = logging.getLogger("auth.dependencies")
+
+# the one signing key for issuing (verify_otp) and checking tokens; required, see check_config()
+JWT_SECRET = os.getenv("GUIDORA_JWT_SECRET")
+JWT_ALGORITHM = os.getenv("GUIDORA_JWT_ALGO", "HS256")
+
+# "db": every cache miss checks the stored token in Mongo.
+# "stateless": signature + expiry + `tv` claim against the in-memory revocation set.
+AUTH_MODE = os.getenv("GUIDORA_AUTH_MODE", "db").strip().lower()
+STATELESS_AUTH = AUTH_MODE == "stateless"
+
+# admin-only endpoints are disabled while this is unset
+ADMIN_KEY = os.getenv("GUIDORA_ADMIN_KEY")
+
+try:
+    TOKEN_CACHE_SIZE = int(os.getenv("GUIDORA_TOKEN_CACHE_SIZE", "10000"))
+except ValueError:
+    TOKEN_CACHE_SIZE = 10000
+
+try:
+    TOKEN_CACHE_TTL = float(os.getenv("GUIDORA_TOKEN_CACHE_TTL", "60"))
+except ValueError:
+    TOKEN_CACHE_TTL = 60.0
+
+
+def check_config():
+    """Called from the lifespan: refuse to start without a signing key."""
+    if not JWT_SECRET:
+        raise RuntimeError("GUIDORA_JWT_SECRET environment variable is not set!")
+
+
+class TokenCache:
+    """
+    Bounded LRU + TTL cache of verified (uid, token) pairs and the uid's role.
+    The cache is per worker process; the TTL bounds how long another worker's
+    revocation can go unnoticed here.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, uid: str, token: str) -> Optional[str]:
+        """Cached role for a verified (uid, token), or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry and entry[0] == token and entry[2] > now:
+                self._entries.move_to_end(uid)
+                self.hits += 1
+                return entry[1]
+            if entry and entry[2] <= now:
+                del self._entries[uid]
+            self.misses += 1
+            return None
+
+    def peek(self, uid: str, token: str) -> Optional[str]:
+        """Like get(), for callers that can do without the role: no stats, no LRU update."""
+        with self._lock:
+            entry = self._entries.get(uid)
+        if entry and entry[0] == token and entry[2] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, uid: str, token: str, role: str, ttl: float | None = None):
+        expires_at = time.monotonic() + min(self.ttl, ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[uid] = (token, role, expires_at)
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, uid: str):
+        with self._lock:
+            if self._entries.pop(uid, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+# revocations written by other workers drop their cached tokens here as well
+revocations.on_revoke = token_cache.invalidate
+
+
+@dataclass
+class AuthContext:
+    uid: str
+    token: str
+    payload: dict
+    # None in stateless mode until resolve_role() is called
+    role: Optional[str]
+
+
+def decode_token(token: str, uid: str) -> dict:
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token format")
+
+    if str(payload.get("uid", "")) != uid:
+        raise HTTPException(status_code=401, detail="Token UID mismatch")
+    return payload
+
+
+async def verify_token(uid: str, token: str) -> AuthContext:
+    """
+    Decode the JWT once, then confirm it is still the token stored for uid.
+    Only cache misses reach Mongo, with a single identity lookup.
+    """
+    if not uid or not token:
+        raise HTTPException(status_code=401, detail="uid and token are required")
+
+    payload = decode_token(token, uid)
+
+    version = payload.get("tv")
+    # tokens issued before `tv` existed, or a revocation set that has gone stale, take the db path
+    if STATELESS_AUTH and isinstance(version, int) and revocations.fresh:
+        if revocations.is_revoked(uid, version):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return AuthContext(uid=uid, token=token, payload=payload, role=token_cache.peek(uid, token))
+
+    role = token_cache.get(uid, token)
+    if role is None:
+        try:
+            identity = await run_db(resolve_identity, uid, token)
+        except Exception:
+            logger.exception("Auth lookup failed for %s", uid)
+            raise HTTPException(status_code=401, detail="Authentication failed")
+
+        if identity is None or not identity.token_valid:
+            logger.warning("No user with UID %s holds the presented token", uid)
+            raise HTTPException(status_code=401, detail="Invalid UID or Token")
+
+        role = identity.role
+        token_cache.put(uid, token, role, _cache_ttl(payload))
+
+    return AuthContext(uid=uid, token=token, payload=payload, role=role)
+
+
+def _cache_ttl(payload: dict) -> Optional[float]:
+    if payload.get("exp"):
+        return max(0.0, float(payload["exp"]) - time.time())
+    return None
+
+
+async def resolve_role(auth: AuthContext) -> str:
+    """Role of the authenticated uid; costs one identity lookup only when not known yet."""
+    if auth.role is None:
+        identity = await run_db(resolve_identity, auth.uid, auth.token)
+        auth.role = identity.role if identity else ROLE_USER
+        if identity and identity.token_valid:
+            token_cache.put(auth.uid, auth.token, auth.role, _cache_ttl(auth.payload))
+    return auth.role
+
+
+async def require_auth(request: Request) -> AuthContext:
+    """
+    FastAPI dependency: reads `uid` and `token` (or legacy `jwt`) from the JSON body.
+    Sub-requests of /batch arrive already authenticated (scope state set in-process only).
+    """
+    batch_auth = request.scope.get("state", {}).get("batch_auth")
+    if batch_auth is not None:
+        return batch_auth
+
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    uid = str(body.get("uid") or "").strip()
+    token = str(body.get("token") or body.get("jwt") or "").strip()
+    return await verify_token(uid, token)
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """FastAPI dependency for admin tools: `X-Admin-Key` must equal GUIDORA_ADMIN_KEY."""
+    if not ADMIN_KEY or not x_admin_key or not hmac.compare_digest(x_admin_key, ADMIN_KEY):
+        raise HTTPException(status_code=403, detail="Admin key required")
+
+
+def next_token_version(uid: str, update: Optional[dict] = None) -> int:
+    """Atomically bump User.token_version (plus any extra `update`) and return the new value."""
+    update = dict(update or {})
+    update["$inc"] = {"token_version": 1}
+    doc = User._get_collection().find_one_and_update(
+        {"uid": uid},
+        update,
+        projection={"token_version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["token_version"] if doc else 0
+
+
+def _clear_token(uid: str):
+    version = next_token_version(uid, {"$unset": {"token": 1, "token_set_at": 1}})
+    Specialties.objects(uid=uid).update_one(unset__token=1, unset__token_set_at=1)
+    if version:
+        revocations.record(uid, version)
+
+
+async def revoke_token(uid: str):
+    await run_db(_clear_token, uid)
+    token_cache.invalidate(uid)
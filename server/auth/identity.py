@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from database.database import User, Specialties
+
+ROLE_USER = "user"
+ROLE_SPECIALIST = "specialist"
+
+
+@dataclass
+class Identity:
+    uid: str
+    role: str
+    token_valid: bool
+
+
+def _branch(uid: str, token: str, role: str) -> list:
+    return [
+        {"$match": {"uid": uid}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "role": {"$literal": role}, "token_valid": {"$eq": ["$token", token]}}},
+    ]
+
+
+def identity_pipeline(uid: str, token: str) -> list:
+    """
+    users + specialties in one aggregate; each branch is a uid point lookup
+    on the unique index.
+    """
+    return _branch(uid, token, ROLE_USER) + [
+        {"$unionWith": {
+            "coll": Specialties._get_collection_name(),
+            "pipeline": _branch(uid, token, ROLE_SPECIALIST),
+        }},
+    ]
+
+
+def resolve_identity(uid: str, token: str) -> Optional[Identity]:
+    """
+    uid -> role + whether `token` is the one stored for it, in a single round trip.
+    A uid present in specialties is a specialist even if it also has a users row.
+    None when the uid is unknown.
+    """
+    rows = list(User._get_collection().aggregate(identity_pipeline(uid, token)))
+    if not rows:
+        return None
+    roles = {row["role"] for row in rows}
+    return Identity(
+        uid=uid,
+        role=ROLE_SPECIALIST if ROLE_SPECIALIST in roles else ROLE_USER,
+        token_valid=any(row.get("token_valid") for row in rows),
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from auth.dependencies import AuthContext, require_auth, revoke_token
+
+router = APIRouter()
+
+class LogoutRequest(BaseModel):
+    uid: str
+    token: str
+
+@router.post("/logout")
+async def logout(payload: LogoutRequest, auth: AuthContext = Depends(require_auth)):
+    await revoke_token(auth.uid)
+    return {"ok": True}
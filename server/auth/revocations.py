@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from database.database import TokenRevocation, REVOCATION_TTL
+from database.aio import run_db
+
+logger = logging.getLogger("auth.revocations")
+
+try:
+    REVOCATION_POLL_INTERVAL = float(os.getenv("GUIDORA_REVOCATION_POLL_INTERVAL", "1"))
+except ValueError:
+    REVOCATION_POLL_INTERVAL = 1.0
+
+try:
+    REVOCATION_MAX_STALENESS = float(os.getenv("GUIDORA_REVOCATION_MAX_STALENESS", "30"))
+except ValueError:
+    REVOCATION_MAX_STALENESS = 30.0
+
+# re-read a little behind the newest event seen, so events written by
+# workers with a slightly late clock are not skipped (applying twice is harmless)
+REVOCATION_OVERLAP = timedelta(seconds=5)
+
+
+def fetch_events(since: Optional[datetime]) -> list:
+    query = {"created_at": {"$gt": since}} if since else {}
+    return list(
+        TokenRevocation._get_collection()
+        .find(query, projection={"_id": 0, "uid": 1, "min_version": 1, "created_at": 1})
+        .sort("created_at", 1)
+    )
+
+
+class RevocationSet:
+    """
+    In-memory copy of token_revocations: uid -> lowest token version still valid.
+    Loaded once at startup, then only events newer than the last one seen are
+    polled every REVOCATION_POLL_INTERVAL seconds (an indexed, usually empty range read).
+    """
+
+    def __init__(self, poll_interval: float, max_staleness: float):
+        self.poll_interval = poll_interval
+        self.max_staleness = max_staleness
+        self.on_revoke: Optional[Callable[[str], None]] = None
+        self._min_version: Dict[str, Tuple[int, datetime]] = {}
+        self._last_seen: Optional[datetime] = None
+        self._refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.events = 0
+
+    @property
+    def fresh(self) -> bool:
+        """False until loaded, or when polling has been failing for too long."""
+        return (
+            self._refreshed_at is not None
+            and time.monotonic() - self._refreshed_at <= self.max_staleness
+        )
+
+    def is_revoked(self, uid: str, version: int) -> bool:
+        entry = self._min_version.get(uid)
+        return entry is not None and version < entry[0]
+
+    def _apply(self, uid: str, min_version: int, created_at: datetime):
+        current = self._min_version.get(uid)
+        if current is None or min_version > current[0]:
+            self._min_version[uid] = (min_version, created_at)
+            self.events += 1
+            if self.on_revoke:
+                self.on_revoke(uid)
+        if self._last_seen is None or created_at > self._last_seen:
+            self._last_seen = created_at
+
+    def record(self, uid: str, min_version: int):
+        """Write a revocation event (blocking, run via run_db) and apply it here right away."""
+        event = TokenRevocation(uid=uid, min_version=min_version)
+        event.save()
+        self._apply(uid, min_version, event.created_at)
+
+    def _prune(self):
+        horizon = datetime.utcnow() - REVOCATION_TTL
+        for uid in [u for u, (_, at) in self._min_version.items() if at < horizon]:
+            del self._min_version[uid]
+
+    async def refresh(self):
+        since = self._last_seen - REVOCATION_OVERLAP if self._last_seen else None
+        for row in await run_db(fetch_events, since):
+            self._apply(row["uid"], row["min_version"], row["created_at"])
+        self._prune()
+        self._refreshed_at = time.monotonic()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Revocation refresh failed")
+
+    async def start(self):
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "uids": len(self._min_version),
+            "events": self.events,
+            "fresh": self.fresh,
+            "last_seen": self._last_seen.isoformat() if self._last_seen else None,
+        }
+
+
+revocations = RevocationSet(REVOCATION_POLL_INTERVAL, REVOCATION_MAX_STALENESS)
@@ -1,15 +1,18 @@
 import re
-import httpx
+import time
+import asyncio
 import logging
 import os
-import asyncio
 import uuid
 
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from database.database import User
+from database.database import User, OtpCode
+from database.aio import run_db
+from auth.dependencies import require_admin
+from auth.sms_provider import sms_client
 
 
 router = APIRouter()
@@ -17,11 +20,16 @@ logger = logging.getLogger("auth.send_otp")
 
 PHONE_RE = re.compile(r"^09\d{9}$")
 
-SMS_API_URL = os.environ.get(
-    "SMS_API_URL"
-)
+try:
+    OTP_RESEND_COOLDOWN = float(os.environ.get("OTP_RESEND_COOLDOWN", "60"))
+except ValueError:
+    OTP_RESEND_COOLDOWN = 60.0
 
-OTP_EXPIRE_SECONDS = 180
+OTP_RECENT_MAX = 10000
+
+_inflight: dict[str, asyncio.Task] = {}
+_recent: dict[str, tuple[float, dict]] = {}
+otp_stats = {"sent": 0, "coalesced": 0, "throttled": 0}
 
 
 def generate_uid() -> str:
@@ -38,11 +46,9 @@ async def send_otp_via_provider(number: str) -> tuple[bool, str | None, str | No
     We only receive it and store it.
     """
     payload = {"to": number}
-    timeout = httpx.Timeout(10.0, read=20.0)
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.post(SMS_API_URL, json=payload)
+        resp = await sms_client.post(payload)
 
         if resp.status_code != 200:
             return False, None, f"HTTP {resp.status_code}"
@@ -65,27 +71,22 @@ async def send_otp_via_provider(number: str) -> tuple[bool, str | None, str | No
         return False, None, str(e)
 
 
-async def expire_otp(number: str, delay: int):
-    await asyncio.sleep(delay)
-
-    user = User.objects(number=number).first()
-    if user and user.otp_set_at:
-        user.otp = None
-        user.otp_set_at = None
-        user.save()
-        logger.info("OTP expired for %s", number)
+def store_otp(number: str, otp_code: str, now: datetime):
+    # کد در کالکشن otp_codes با TTL index نگه داشته می‌شود و خودکار پاک می‌شود
+    OtpCode.objects(number=number).update_one(
+        upsert=True,
+        set__code=otp_code,
+        set__created_at=now
+    )
+    User.objects(number=number).update_one(
+        upsert=True,
+        set__number=number,
+        set_on_insert__uid=generate_uid(),
+        set_on_insert__created_at=now
+    )
 
 
-@router.post("/send_otp")
-async def send_otp_endpoint(
-    payload: SendOtpRequest,
-    background_tasks: BackgroundTasks
-):
-    number = payload.number.strip()
-
-    if not PHONE_RE.match(number):
-        raise HTTPException(status_code=400, detail="Invalid phone number")
-
+async def deliver_otp(number: str) -> dict:
     success, otp_code, error = await send_otp_via_provider(number)
 
     if not success:
@@ -94,21 +95,56 @@ async def send_otp_endpoint(
     now = datetime.utcnow()
 
     try:
-        User.objects(number=number).update_one(
-            upsert=True,
-            set__number=number,
-            set__otp=otp_code,
-            set__otp_set_at=now,
-            set_on_insert__uid=generate_uid(),
-            set_on_insert__created_at=now
-        )
+        await run_db(store_otp, number, otp_code, now)
     except Exception:
         logger.exception("Database error")
         raise HTTPException(status_code=500, detail="Database error")
 
-    background_tasks.add_task(expire_otp, number, OTP_EXPIRE_SECONDS)
-
     return {
         "ok": True,
         "sms_sent": True
     }
+
+
+def _prune_recent(now: float):
+    if len(_recent) > OTP_RECENT_MAX:
+        for n in [n for n, (ts, _) in _recent.items() if now - ts >= OTP_RESEND_COOLDOWN]:
+            del _recent[n]
+
+
+@router.post("/send_otp")
+async def send_otp_endpoint(payload: SendOtpRequest):
+    number = payload.number.strip()
+
+    if not PHONE_RE.match(number):
+        raise HTTPException(status_code=400, detail="Invalid phone number")
+
+    # تکرار در بازه‌ی cooldown: همان پاسخ قبلی از حافظه، بدون پیامک و بدون نوشتن در دیتابیس
+    now = time.monotonic()
+    recent = _recent.get(number)
+    if recent and now - recent[0] < OTP_RESEND_COOLDOWN:
+        otp_stats["throttled"] += 1
+        return recent[1]
+
+    # درخواست‌های هم‌زمان برای یک شماره فقط یک بار به سرویس پیامک می‌رسند
+    task = _inflight.get(number)
+    if task is not None:
+        otp_stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    task = asyncio.create_task(deliver_otp(number))
+    _inflight[number] = task
+    try:
+        result = await asyncio.shield(task)
+    finally:
+        _inflight.pop(number, None)
+
+    otp_stats["sent"] += 1
+    _recent[number] = (time.monotonic(), result)
+    _prune_recent(now)
+    return result
+
+
+@router.get("/send_otp_stats", dependencies=[Depends(require_admin)])
+async def send_otp_stats():
+    return {**otp_stats, "in_flight": len(_inflight), "provider": sms_client.stats()}
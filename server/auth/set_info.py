@@ -1,11 +1,14 @@
-from fastapi import APIRouter, HTTPException, Request
-from database.database import User, Specialties
-from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Request
+from mongoengine import ValidationError
+from database.database import Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from profile.upsert import profile_written, upsert_profile, validated_fields
 
 router = APIRouter()
 
 @router.post("/set_info")
-async def set_info(request: Request):
+async def set_info(request: Request, auth: AuthContext = Depends(require_auth)):
     data = await request.json()
 
     token = str(data.get("token", "")).strip()
@@ -32,42 +35,28 @@ async def set_info(request: Request):
     tag = [str(t).strip().lower() for t in tag if t]
 
 
-    owner = Specialties.objects(uid=uid, token=token).first() \
-            or User.objects(uid=uid, token=token).first()
+    try:
+        fields = validated_fields(Specialties, uid, {
+            "fname": fname,
+            "lname": lname,
+            "number": number,
+            "tag": tag,
+            "token": token,
+        })
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if not owner:
-        raise HTTPException(status_code=403, detail="Invalid uid or token")
+    # پاسخ همان مقادیری است که نوشته شد؛ خواندن دوباره لازم نیست
+    await run_db(upsert_profile, Specialties, uid, fields, return_doc=False)
 
-
-    sp = Specialties.objects(uid=uid).first()
-
-    if sp:
-        sp.update(
-            set__fname=fname,
-            set__lname=lname,
-            set__number=number,
-            set__tag=tag,
-            set__token=token
-        )
-    else:
-        sp = Specialties(
-            uid=uid,
-            fname=fname,
-            lname=lname,
-            number=number,
-            tag=tag,
-            token=token
-        )
-        sp.save()
-
-    sp = Specialties.objects(uid=uid).first()
+    profile_written(uid)
 
     return {
         "ok": True,
         "role": "Specialist",
-        "uid": sp.uid,
-        "fname": sp.fname,
-        "lname": sp.lname,
-        "number": sp.number,
-        "tag": sp.tag
+        "uid": uid,
+        "fname": fields.get("fname"),
+        "lname": fields.get("lname"),
+        "number": fields.get("number"),
+        "tag": fields.get("tag", [])
     }
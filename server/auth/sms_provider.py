@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger("auth.sms_provider")
+
+
+SMS_API_URL = os.environ.get("SMS_API_URL")
+try:
+    SMS_CONNECT_TIMEOUT = float(os.environ.get("SMS_CONNECT_TIMEOUT", "3.0"))
+except ValueError:
+    SMS_CONNECT_TIMEOUT = 3.0
+try:
+    SMS_READ_TIMEOUT = float(os.environ.get("SMS_READ_TIMEOUT", "8.0"))
+except ValueError:
+    SMS_READ_TIMEOUT = 8.0
+try:
+    SMS_MAX_CONNECTIONS = int(os.environ.get("SMS_MAX_CONNECTIONS", "20"))
+except ValueError:
+    SMS_MAX_CONNECTIONS = 20
+try:
+    SMS_MAX_CONCURRENCY = int(os.environ.get("SMS_MAX_CONCURRENCY", "20"))
+except ValueError:
+    SMS_MAX_CONCURRENCY = 20
+try:
+    SMS_QUEUE_TIMEOUT = float(os.environ.get("SMS_QUEUE_TIMEOUT", "2.0"))
+except ValueError:
+    SMS_QUEUE_TIMEOUT = 2.0
+try:
+    SMS_MAX_RETRIES = int(os.environ.get("SMS_MAX_RETRIES", "2"))
+except ValueError:
+    SMS_MAX_RETRIES = 2
+try:
+    SMS_RETRY_BASE_DELAY = float(os.environ.get("SMS_RETRY_BASE_DELAY", "0.2"))
+except ValueError:
+    SMS_RETRY_BASE_DELAY = 0.2
+try:
+    SMS_RETRY_MAX_DELAY = float(os.environ.get("SMS_RETRY_MAX_DELAY", "2.0"))
+except ValueError:
+    SMS_RETRY_MAX_DELAY = 2.0
+try:
+    SMS_BREAKER_THRESHOLD = int(os.environ.get("SMS_BREAKER_THRESHOLD", "5"))
+except ValueError:
+    SMS_BREAKER_THRESHOLD = 5
+try:
+    SMS_BREAKER_RESET = float(os.environ.get("SMS_BREAKER_RESET", "30.0"))
+except ValueError:
+    SMS_BREAKER_RESET = 30.0
+
+# provider trouble: counts against the breaker (other 4xx are our fault and neutral)
+FAILURE_STATUS = {429, 500, 502, 503, 504}
+# sending an OTP is not idempotent: only retry when the request provably never
+# reached the provider. A read timeout or a 5xx may follow an accepted send.
+NEVER_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class SmsProviderUnavailable(Exception):
+    """Raised without contacting the provider: breaker open or no free slot."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures;
+    open -> half-open after `reset_timeout`, letting one trial call through.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def abandon_trial(self):
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class SmsProviderClient:
+    """
+    One keep-alive httpx client for the whole app lifetime, with bounded
+    concurrency, jittered retries of requests that never left and a circuit breaker.
+    """
+
+    def __init__(self, url: Optional[str]):
+        self.url = url
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(SMS_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(SMS_BREAKER_THRESHOLD, SMS_BREAKER_RESET)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(SMS_READ_TIMEOUT, connect=SMS_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=SMS_MAX_CONNECTIONS,
+                    max_keepalive_connections=SMS_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(SMS_RETRY_MAX_DELAY, SMS_RETRY_BASE_DELAY * (2 ** attempt)))
+
+    async def post(self, payload: dict) -> httpx.Response:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise SmsProviderUnavailable("circuit open")
+
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), SMS_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            self.breaker.abandon_trial()
+            raise SmsProviderUnavailable("too many concurrent SMS requests")
+
+        try:
+            resp = await self._post_with_retries(payload)
+        except BaseException:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._semaphore.release()
+
+        if resp.status_code in FAILURE_STATUS:
+            self.failures += 1
+            self.breaker.record_failure()
+        elif resp.status_code < 400:
+            self.breaker.record_success()
+        else:
+            # a rejected request says nothing about the provider's health
+            self.breaker.abandon_trial()
+        return resp
+
+    async def _post_with_retries(self, payload: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                return await self._get_client().post(self.url, json=payload)
+            except NEVER_SENT_ERRORS as e:
+                if attempt >= SMS_MAX_RETRIES:
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning("SMS provider unreachable (%r), retry %d", e, attempt)
+            await asyncio.sleep(self._backoff(attempt))
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.state,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+sms_client = SmsProviderClient(SMS_API_URL)
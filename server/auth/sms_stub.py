@@ -0,0 +1,62 @@
+"""
+Local stand-in for the SMS gateway, for offline latency / failure testing.
+
+    STUB_LATENCY_MS=150 STUB_FAILURE_RATE=0.2 uvicorn auth.sms_stub:app --port 9000
+    SMS_API_URL=http://127.0.0.1:9000/send uvicorn main:app
+
+STUB_LATENCY_MS / STUB_JITTER_MS  delay before answering
+STUB_FAILURE_RATE                 share of requests answered with 503
+STUB_HANG_RATE                    share of requests that never answer in time (60 s)
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Guidora SMS stub")
+
+
+try:
+    STUB_LATENCY_MS = float(os.environ.get("STUB_LATENCY_MS", "50"))
+except ValueError:
+    STUB_LATENCY_MS = 50
+try:
+    STUB_JITTER_MS = float(os.environ.get("STUB_JITTER_MS", "20"))
+except ValueError:
+    STUB_JITTER_MS = 20
+try:
+    STUB_FAILURE_RATE = float(os.environ.get("STUB_FAILURE_RATE", "0.0"))
+except ValueError:
+    STUB_FAILURE_RATE = 0.0
+try:
+    STUB_HANG_RATE = float(os.environ.get("STUB_HANG_RATE", "0.0"))
+except ValueError:
+    STUB_HANG_RATE = 0.0
+
+stats = {"requests": 0, "failed": 0, "hung": 0}
+
+
+@app.post("/send")
+async def send(request: Request):
+    stats["requests"] += 1
+    payload = await request.json()
+
+    if random.random() < STUB_HANG_RATE:
+        stats["hung"] += 1
+        await asyncio.sleep(60)
+
+    delay = STUB_LATENCY_MS + random.uniform(-STUB_JITTER_MS, STUB_JITTER_MS)
+    await asyncio.sleep(max(0.0, delay) / 1000)
+
+    if random.random() < STUB_FAILURE_RATE:
+        stats["failed"] += 1
+        return JSONResponse(status_code=503, content={"status": "unavailable"})
+
+    return {"status": "success", "to": payload.get("to"), "code": f"{random.randint(0, 99999):05d}"}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -1,23 +1,17 @@
-import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 import jwt
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from database.database import User
+from database.database import User, OtpCode, OTP_TTL, JWT_TTL
+from database.aio import run_db
+from auth.dependencies import JWT_ALGORITHM, JWT_SECRET, next_token_version, token_cache
+from auth.revocations import revocations
 
 router = APIRouter()
 logger = logging.getLogger("auth.verify_otp")
 
-# تنظیمات JWT
-JWT_SECRET = os.getenv("GUIDORA_JWT_SECRET", "your-fallback-secret")
-JWT_ALGORITHM = os.getenv("GUIDORA_JWT_ALGO", "HS256")
-
-try:
-    JWT_EXPIRE_DAYS = int(os.getenv("GUIDORA_JWT_EXPIRE_DAYS", "3"))
-except ValueError:
-    JWT_EXPIRE_DAYS = 3
-
+# تنظیمات JWT (کلید و الگوریتم در auth/dependencies.py)
 class VerifyOtpRequest(BaseModel):
     number: str
     otp: str
@@ -26,32 +20,38 @@ class VerifyOtpResponse(BaseModel):
     token: str
     uid: str
 
+def consume_otp(number: str, otp: str):
+    # find_one_and_delete: هر کد فقط یک بار قابل استفاده است
+    return OtpCode._get_collection().find_one_and_delete({"number": number, "code": otp})
+
 @router.post("/verify_otp", response_model=VerifyOtpResponse)
 async def verify_otp_endpoint(payload: VerifyOtpRequest):
     number = payload.number.strip()
     otp = payload.otp.strip()
 
-    obj = User.objects(number=number).first()
+    obj = await run_db(User.objects(number=number).first)
 
     if not obj:
         raise HTTPException(status_code=404, detail="شماره موبایل یافت نشد")
 
-    if not getattr(obj, "otp", None) or obj.otp != otp:
+    otp_doc = await run_db(consume_otp, number, otp)
+    if not otp_doc:
         raise HTTPException(status_code=400, detail="کد وارد شده اشتباه است")
 
-    if getattr(obj, "otp_set_at", None):
-        diff = (datetime.utcnow() - obj.otp_set_at).total_seconds()
-        if diff > 180:
-            obj.update(unset__otp=1, unset__otp_set_at=1)
-            raise HTTPException(status_code=400, detail="کد منقضی شده است")
+    if datetime.utcnow() - otp_doc["created_at"] > OTP_TTL:
+        raise HTTPException(status_code=400, detail="کد منقضی شده است")
 
     user_uid = str(obj.uid) 
 
-    expire_at = datetime.utcnow() + timedelta(days=JWT_EXPIRE_DAYS)
+    # نسخه‌ی جدید توکن؛ توکن‌های قبلی این کاربر با نسخه‌ی کمتر باطل می‌شوند
+    token_version = await run_db(next_token_version, user_uid)
+
+    expire_at = datetime.utcnow() + JWT_TTL
     
     token_payload = {
         "uid": user_uid,
         "number": number,
+        "tv": token_version,
         "exp": expire_at
     }
 
@@ -62,7 +62,8 @@ async def verify_otp_endpoint(payload: VerifyOtpRequest):
         raise HTTPException(status_code=500, detail="خطا در تولید توکن")
 
     try:
-        obj.update(
+        await run_db(
+            obj.update,
             set__token=token,
             unset__otp=1,
             unset__otp_set_at=1
@@ -71,4 +72,12 @@ async def verify_otp_endpoint(payload: VerifyOtpRequest):
         logger.exception("Failed to save token to database")
         raise HTTPException(status_code=500, detail="خطای دیتابیس در ذخیره توکن")
 
+    try:
+        await run_db(revocations.record, user_uid, token_version)
+    except Exception:
+        # the db-mode check already rejects older tokens; stateless mode misses this one event
+        logger.exception("Failed to record token revocation for %s", user_uid)
+
+    token_cache.invalidate(user_uid)
+
     return {"token": token, "uid": user_uid}
\ No newline at end of file
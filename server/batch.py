@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel
+
+from auth.dependencies import AuthContext, require_auth
+from encoding import negotiated_response
+
+router = APIRouter()
+logger = logging.getLogger("batch")
+
+try:
+    BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "10"))
+except ValueError:
+    BATCH_MAX_REQUESTS = 10
+
+# هدرهایی که از درخواست اصلی به زیر-درخواست‌ها منتقل می‌شوند؛ Accept نه:
+# زیر-پاسخ‌ها JSON می‌مانند و قالب کل پاسخ batch یک بار انتخاب می‌شود
+FORWARDED_HEADERS = ("accept-encoding", "user-agent")
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET", "POST"] = "POST"
+    path: str
+    body: Dict = {}
+    headers: Dict[str, str] = {}
+
+
+class BatchRequest(BaseModel):
+    uid: str
+    token: str
+    requests: List[SubRequest]
+
+
+async def dispatch(app, sub: SubRequest, auth: AuthContext, headers: Dict[str, str]) -> dict:
+    """
+    Run one sub-request through the app in-process (full routing, validation and
+    middleware), with uid/token forced to the batch's own and auth already done.
+    """
+    body = dict(sub.body, uid=auth.uid, token=auth.token)
+    payload = json.dumps(body).encode() if sub.method == "POST" else b""
+    path, _, query = sub.path.partition("?")
+
+    raw_headers = {k.lower(): v for k, v in headers.items()}
+    raw_headers.update({k.lower(): v for k, v in sub.headers.items()})
+    raw_headers["content-type"] = "application/json"
+    raw_headers["accept"] = "application/json"
+    raw_headers["content-length"] = str(len(payload))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": sub.method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in raw_headers.items()],
+        "client": None,
+        "server": None,
+        "state": {"batch_auth": auth},
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # the sub-request never disconnects on its own
+        await asyncio.Event().wait()
+
+    status, response_headers, chunks = 500, {}, []
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+
+    raw = b"".join(chunks)
+    try:
+        result = json.loads(raw) if raw else None
+    except ValueError:
+        result = raw.decode("utf-8", "replace")
+    out = {"id": sub.id, "path": sub.path, "status": status, "body": result}
+    if "etag" in response_headers:
+        out["etag"] = response_headers["etag"]
+    return out
+
+
+# چند درخواست در یک رفت‌وبرگشت: یک بار احراز هویت، اجرای هم‌زمان
+@router.post("/batch")
+async def batch(data: BatchRequest, request: Request, auth: AuthContext = Depends(require_auth)):
+    if not data.requests:
+        raise HTTPException(status_code=400, detail="requests must not be empty")
+    if len(data.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    for sub in data.requests:
+        if not sub.path.startswith("/") or sub.path.split("?")[0].rstrip("/") == "/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid path {sub.path!r}")
+
+    headers = {h: request.headers[h] for h in FORWARDED_HEADERS if h in request.headers}
+    results = await asyncio.gather(
+        *(dispatch(request.app, sub, auth, headers) for sub in data.requests),
+        return_exceptions=True,
+    )
+
+    responses = []
+    for sub, result in zip(data.requests, results):
+        if isinstance(result, BaseException):
+            logger.error("Batch sub-request %s failed: %r", sub.path, result)
+            result = {"id": sub.id, "path": sub.path, "status": 500, "body": {"detail": "Internal error"}}
+        responses.append(result)
+    return negotiated_response(request, {"responses": responses})
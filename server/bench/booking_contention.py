@@ -0,0 +1,98 @@
+"""
+Booking contention stress test: several processes book the slots of one
+specialist at the same time through reservation.booking.book_slots.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.booking_contention [--processes 8] [--days 7]
+
+Every process walks all single and double half-hour slots of the specialist
+in its own random order, so most attempts collide. Afterwards the appointment
+masks are checked against the specialist's `booked` map: a bit held by two
+appointments is a double booking. Exit code is 1 if there is any.
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+
+from bench.common import configure_logging, log, seed_specialists, seed_users, tomorrow, unseed
+from database.connection import mongo
+from database.database import Appointment, Specialties
+from reservation.booking import book_slots
+from reservation.slots import DAY_FORMAT, FULL_DAY, SLOTS_PER_DAY
+
+SPECIALIST = ("bench", "0")
+
+
+def candidate_requests(days: list) -> list:
+    """Every 1- and 2-slot request on the given days, as day -> mask maps."""
+    requests = []
+    for day in days:
+        for index in range(SLOTS_PER_DAY):
+            requests.append({day: 1 << index})
+            if index + 1 < SLOTS_PER_DAY:
+                requests.append({day: 0b11 << index})
+    return requests
+
+
+def worker(args) -> Counter:
+    user_uid, days, seed = args
+    mongo.connect()
+    requests = candidate_requests(days)
+    random.Random(seed).shuffle(requests)
+    outcome = Counter()
+    for day_masks in requests:
+        outcome[book_slots(user_uid, *SPECIALIST, day_masks)["status"]] += 1
+    return outcome
+
+
+def double_bookings(specialist_uid: str) -> dict:
+    """Bits held by more than one appointment, and appointment bits missing from `booked`."""
+    held = Counter()
+    union = {}
+    for doc in Appointment._get_collection().find({"specialist_uid": specialist_uid}, projection={"day": 1, "mask": 1}):
+        held[doc["day"]] += bin(doc["mask"]).count("1")
+        union[doc["day"]] = union.get(doc["day"], 0) | doc["mask"]
+    booked = Specialties._get_collection().find_one({"uid": specialist_uid}, projection={"booked": 1})["booked"]
+    return {
+        "slots": sum(bin(mask).count("1") for mask in union.values()),
+        "double": sum(held[day] - bin(mask).count("1") for day, mask in union.items()),
+        "unrecorded": sum(bin(mask & ~union.get(day, 0)).count("1") for day, mask in booked.items()),
+        "lost": sum(bin(mask & ~booked.get(day, 0)).count("1") for day, mask in union.items()),
+    }
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--days", type=int, default=7, help="fully available days to fight over")
+    args = parser.parse_args()
+
+    mongo.connect()
+    unseed()
+    days = [(tomorrow() + timedelta(days=d)).strftime(DAY_FORMAT) for d in range(args.days)]
+    users = seed_users(args.processes)
+    specialist = seed_specialists(1, availability=dict.fromkeys(days, FULL_DAY))[0]
+    try:
+        # fresh interpreters, each with its own connection pool
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            started = time.perf_counter()
+            outcomes = pool.map(worker, [(user["uid"], days, i) for i, user in enumerate(users)])
+            wall = time.perf_counter() - started
+        result = double_bookings(specialist["uid"])
+    finally:
+        unseed()
+
+    total = sum(outcomes, Counter())
+    attempts = sum(total.values())
+    log.info("%d processes, %d attempts in %.2fs: %.0f attempts/s, %.0f bookings/s",
+             args.processes, attempts, wall, attempts / wall, total["ok"] / wall)
+    log.info("outcomes: %s", dict(total))
+    log.info("slots booked %d of %d, double-booked bits %d, booked bits without appointment %d, "
+             "appointment bits missing from booked %d",
+             result["slots"], len(days) * SLOTS_PER_DAY, result["double"], result["unrecorded"], result["lost"])
+    if result["double"] or result["unrecorded"] or result["lost"]:
+        sys.exit(1)
@@ -0,0 +1,75 @@
+"""
+/auth/check_jwt throughput in each auth mode.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.check_jwt [--users 100] [--concurrency 50] [--seconds 10]
+
+Starts one worker per mode: "db" (token cache on), "db-nocache" (every call
+checks Mongo) and "stateless" (signature, expiry and the revocation set).
+--concurrency clients call in a closed loop, each cycling through --users
+logged-in users.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from bench.common import configure_logging, log, log_latency, seed_users, serve, unseed
+from database.connection import mongo
+
+MODES = {
+    "db": {"GUIDORA_AUTH_MODE": "db"},
+    "db-nocache": {"GUIDORA_AUTH_MODE": "db", "GUIDORA_TOKEN_CACHE_SIZE": "0"},
+    "stateless": {"GUIDORA_AUTH_MODE": "stateless"},
+}
+
+
+async def client_loop(client: httpx.AsyncClient, users: list, offset: int, deadline: float,
+                      samples: list, statuses: Counter):
+    i = offset
+    while time.perf_counter() < deadline:
+        user = users[i % len(users)]
+        i += 1
+        started = time.perf_counter()
+        response = await client.post("/auth/check_jwt", json={"uid": user["uid"], "token": user["token"]})
+        samples.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+
+
+async def run(url: str, users: list, concurrency: int, seconds: float) -> tuple:
+    samples, statuses = [], Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        # one pass first so "db" measures a warm token cache
+        await asyncio.gather(*(client.post("/auth/check_jwt", json={"uid": u["uid"], "token": u["token"]})
+                               for u in users))
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(
+            client_loop(client, users, i, deadline, samples, statuses) for i in range(concurrency)
+        ))
+    return samples, statuses
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--mode", choices=sorted(MODES), action="append", help="run only this mode (repeatable)")
+    args = parser.parse_args()
+
+    mongo.connect()
+    unseed()
+    users = seed_users(args.users)
+    try:
+        for mode in args.mode or list(MODES):
+            with serve(MODES[mode]) as server:
+                samples, statuses = asyncio.run(run(server.url, users, args.concurrency, args.seconds))
+                commands = sum(c["commands"] for c in server.admin_get("/db_stats")["commands"].values())
+            log.info("%-10s %7.0f req/s, %d Mongo commands, statuses %s",
+                     mode, len(samples) / args.seconds, commands, dict(statuses))
+            log_latency(f"  {mode}", samples)
+    finally:
+        unseed()
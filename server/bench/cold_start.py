@@ -0,0 +1,49 @@
+"""
+Cold-start benchmark: time from starting a uvicorn worker to its first 200,
+then the first Mongo-backed request against the warm ones that follow.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.cold_start [--runs 5]
+
+The lifespan connects, ensures indexes and opens MONGO_MIN_POOL_SIZE
+connections before the worker accepts traffic, so "ready" includes all of it
+("mongo" is the share reported by /db_stats). Set MONGO_MIN_POOL_SIZE=0 to
+see the cost moved onto the first requests instead.
+"""
+import argparse
+import statistics
+import time
+
+import httpx
+
+from bench.common import configure_logging, log, seed_users, serve, unseed
+from database.connection import mongo
+
+WARM_REQUESTS = 20
+
+
+def timed_homepage(url: str, user: dict) -> float:
+    started = time.perf_counter()
+    response = httpx.post(url + "/home/homepage", json={"uid": user["uid"], "token": user["token"]}, timeout=30)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    mongo.connect()
+    unseed()
+    user = seed_users(1)[0]
+    try:
+        for run in range(1, args.runs + 1):
+            with serve() as server:
+                startup_ms = server.admin_get("/db_stats")["startup_ms"]
+                first = timed_homepage(server.url, user)
+                warm = statistics.median(timed_homepage(server.url, user) for _ in range(WARM_REQUESTS))
+            log.info("run %d: ready %.0fms (mongo %.0fms), first homepage %.1fms, warm median %.1fms",
+                     run, server.ready_seconds * 1000, startup_ms, first * 1000, warm * 1000)
+    finally:
+        unseed()
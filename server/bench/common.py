@@ -0,0 +1,196 @@
+"""
+Helpers shared by the benchmarks in this package.
+
+Benchmarks run against a real mongod: point MONGO_URI at a scratch database.
+Seeded users and specialists get "bench-" uids and are deleted again, with
+their appointments, by unseed(). HTTP benchmarks start their own uvicorn
+worker with serve(), or take --url to use one that is already running.
+"""
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import jwt
+from bson.int64 import Int64
+
+from database.database import Appointment, Specialties, User
+from reservation.slots import day_masks_to_iso
+
+log = logging.getLogger("bench")
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+BENCH_PREFIX = "bench-"
+BENCH_PORT = 8765
+# tokens are signed here, so the bench and the server must share the key
+BENCH_JWT_SECRET = os.environ.get("GUIDORA_JWT_SECRET") or secrets.token_hex(32)
+BENCH_ADMIN_KEY = os.environ.get("GUIDORA_ADMIN_KEY") or secrets.token_hex(16)
+
+
+def configure_logging():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # one line per request would drown the results
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+@dataclass
+class Server:
+    url: str
+    pid: Optional[int]
+    # process start -> first 200 on "/" (None for --url)
+    ready_seconds: Optional[float] = None
+
+    def admin_get(self, path: str) -> dict:
+        response = httpx.get(self.url + path, headers={"X-Admin-Key": BENCH_ADMIN_KEY}, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def rss_mb(self) -> Optional[float]:
+        """Resident memory of the spawned worker (Linux only)."""
+        if self.pid is None:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def serve(env: Optional[Dict[str, str]] = None, port: int = BENCH_PORT, url: Optional[str] = None):
+    """A uvicorn worker on `port` with `env` on top of ours; with `url`, just use that server."""
+    if url:
+        yield Server(url.rstrip("/"), None)
+        return
+
+    server_env = dict(
+        os.environ,
+        GUIDORA_JWT_SECRET=BENCH_JWT_SECRET,
+        GUIDORA_ADMIN_KEY=BENCH_ADMIN_KEY,
+        **(env or {}),
+    )
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR,
+        env=server_env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base, proc)
+        yield Server(base, proc.pid, time.perf_counter() - started)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50 / p90 / p99 / max of durations in seconds, as milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"n": len(ordered), "p50": at(0.50), "p90": at(0.90), "p99": at(0.99), "max": ordered[-1] * 1000}
+
+
+def log_latency(name: str, samples: List[float]):
+    p = percentiles(samples)
+    if not p["n"]:
+        log.info("%-28s no samples", name)
+        return
+    log.info("%-28s n=%-6d p50=%7.1fms p90=%7.1fms p99=%7.1fms max=%7.1fms",
+             name, p["n"], p["p50"], p["p90"], p["p99"], p["max"])
+
+
+def bench_token(uid: str, number: str, version: int = 1) -> str:
+    """A token like the one verify_otp issues, signed with BENCH_JWT_SECRET."""
+    payload = {"uid": uid, "number": number, "tv": version, "exp": datetime.utcnow() + timedelta(days=1)}
+    return jwt.encode(payload, BENCH_JWT_SECRET, algorithm=os.environ.get("GUIDORA_JWT_ALGO", "HS256"))
+
+
+def seed_users(n: int, legacy: bool = False) -> List[dict]:
+    """
+    n logged-in users: [{"uid", "token", "number"}]. legacy=True writes only
+    the fields the pre-bitmap schema declares, so that server can load them.
+    """
+    users = []
+    for i in range(n):
+        uid, number = f"{BENCH_PREFIX}u{i}", f"0990{i:07d}"
+        users.append({"uid": uid, "number": number, "token": bench_token(uid, number)})
+    extra = {} if legacy else {"token_version": 1, "schedule": {}, "schedule_rev": 0}
+    User._get_collection().insert_many([dict(user, created_at=datetime.utcnow(), **extra) for user in users])
+    return users
+
+
+def seed_specialists(n: int, availability: Optional[Dict[str, int]] = None,
+                     template: Optional[Dict[str, int]] = None, legacy: bool = False) -> List[dict]:
+    """
+    n specialists named "bench" / "<i>" offering the given bitmaps; with
+    legacy=True `availability` is stored as available_slots chunk strings instead.
+    """
+    specialists = []
+    for i in range(n):
+        uid, number = f"{BENCH_PREFIX}s{i}", f"0991{i:07d}"
+        doc = {
+            "uid": uid,
+            "number": number,
+            "fname": "bench",
+            "lname": str(i),
+            "tag": ["law" if i % 2 else "edu"],
+            "about": f"bench specialist {i}",
+            "educert": "",
+            "token": bench_token(uid, number),
+            "created_at": datetime.utcnow(),
+        }
+        if legacy:
+            doc["available_slots"] = day_masks_to_iso(availability or {})
+        else:
+            doc["availability"] = {day: Int64(mask) for day, mask in (availability or {}).items()}
+            doc["weekly_template"] = {day: Int64(mask) for day, mask in (template or {}).items()}
+            doc["booked"] = {}
+        specialists.append(doc)
+    for start in range(0, n, 1000):
+        Specialties._get_collection().insert_many(specialists[start:start + 1000])
+    return specialists
+
+
+def unseed():
+    bench_uid = {"$regex": f"^{BENCH_PREFIX}"}
+    for model in (User, Specialties):
+        model._get_collection().delete_many({"uid": bench_uid})
+    Appointment._get_collection().delete_many({"user_uid": bench_uid})
+
+
+def tomorrow() -> datetime:
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
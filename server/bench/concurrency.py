@@ -0,0 +1,106 @@
+"""
+Concurrency benchmark: N parallel /home/homepage and N parallel
+/reservation/set_user_slot calls against one worker, latency percentiles
+per route.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.concurrency [--parallel 500] [--url URL]
+
+With --url the server must share GUIDORA_JWT_SECRET with this process.
+
+The "before" number comes from the pre-bitmap baseline, which has no bench
+package and books from Specialties.available_slots. Serve it from a worktree
+and drive it from this tree with the legacy seed:
+
+    git worktree add /tmp/guidora-base <baseline commit>
+    cd /tmp/guidora-base/server && MONGO_URI=... GUIDORA_JWT_SECRET=<key> uvicorn main:app --port 8000
+    MONGO_URI=... GUIDORA_JWT_SECRET=<key> python -m bench.concurrency --legacy-slots --url http://127.0.0.1:8000
+
+Use an otherwise empty database: the baseline models reject documents with
+fields they do not declare.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import timedelta
+
+import httpx
+
+from bench.common import configure_logging, log, log_latency, seed_specialists, seed_users, serve, tomorrow, unseed
+from database.connection import mongo
+from reservation.slots import DAY_FORMAT, FULL_DAY, SLOTS_PER_DAY, slot_time
+
+
+def booking_body(user: dict, i: int) -> dict:
+    """User i books the i-th free half hour of specialist bench/0, so no two calls collide."""
+    day = (tomorrow() + timedelta(days=i // SLOTS_PER_DAY)).strftime(DAY_FORMAT)
+    index = i % SLOTS_PER_DAY
+    end = "24:00" if index + 1 == SLOTS_PER_DAY else slot_time(index + 1)
+    return {
+        "uid": user["uid"],
+        "token": user["token"],
+        "fname": "bench",
+        "lname": "0",
+        "slots": [{"day": day, "start": slot_time(index), "end": end}],
+    }
+
+
+async def timed_post(client: httpx.AsyncClient, path: str, body: dict, samples: list, statuses: Counter):
+    started = time.perf_counter()
+    try:
+        response = await client.post(path, json=body)
+        statuses[(path, response.status_code)] += 1
+    except httpx.TransportError as e:
+        statuses[(path, type(e).__name__)] += 1
+    samples.append(time.perf_counter() - started)
+
+
+async def run(url: str, users: list, parallel: int) -> dict:
+    samples = {"/home/homepage": [], "/reservation/set_user_slot": []}
+    statuses = Counter()
+    limits = httpx.Limits(max_connections=2 * parallel, max_keepalive_connections=2 * parallel)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        calls = []
+        for i in range(parallel):
+            user = users[i]
+            auth = {"uid": user["uid"], "token": user["token"]}
+            calls.append(timed_post(client, "/home/homepage", auth, samples["/home/homepage"], statuses))
+            calls.append(timed_post(
+                client, "/reservation/set_user_slot", booking_body(user, i),
+                samples["/reservation/set_user_slot"], statuses,
+            ))
+        started = time.perf_counter()
+        await asyncio.gather(*calls)
+        wall = time.perf_counter() - started
+    return {"samples": samples, "statuses": statuses, "wall": wall}
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parallel", type=int, default=500, help="concurrent calls per route")
+    parser.add_argument("--url", help="use a running server instead of starting one")
+    parser.add_argument("--legacy-slots", action="store_true",
+                        help="seed the pre-bitmap schema (available_slots strings) for a baseline server")
+    args = parser.parse_args()
+    if args.legacy_slots and not args.url:
+        parser.error("--legacy-slots needs --url pointing at a baseline server")
+
+    mongo.connect()
+    unseed()
+    days = args.parallel // SLOTS_PER_DAY + 1
+    users = seed_users(args.parallel, legacy=args.legacy_slots)
+    seed_specialists(1, availability={
+        (tomorrow() + timedelta(days=d)).strftime(DAY_FORMAT): FULL_DAY for d in range(days)
+    }, legacy=args.legacy_slots)
+    try:
+        with serve(url=args.url) as server:
+            result = asyncio.run(run(server.url, users, args.parallel))
+    finally:
+        unseed()
+
+    log.info("%d parallel calls per route, wall %.2fs", args.parallel, result["wall"])
+    for path, samples in result["samples"].items():
+        log_latency(path, samples)
+    for (path, status), count in sorted(result["statuses"].items(), key=str):
+        log.info("  %s -> %s x%d", path, status, count)
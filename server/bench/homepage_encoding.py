@@ -0,0 +1,89 @@
+"""
+Homepage response size and encode time: the old response_model path against
+encoding.encode_map in JSON and MessagePack. No mongod needed.
+
+    python -m bench.homepage_encoding [--specialists 5000] [--repeat 20]
+
+"pydantic" rebuilds the pre-negotiation path: SpecialistData objects,
+HomeData validation, jsonable_encoder and JSONResponse's json.dumps.
+"cached" splices a CatalogPage-style pre-encoded specialists list, which is
+what a homepage request pays once its page is in the catalog.
+"""
+import argparse
+import gzip
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from bench.common import configure_logging, log
+from encoding import JSON, MSGPACK, Encoded, encode, encode_map
+from home.catalog import serialize_specialist
+from home.homepage import HomeData, SpecialistData
+
+CURRENT_USER = {
+    "uid": "bench-u0", "number": "09900000000", "fname": "bench", "lname": "user",
+    "gender": "", "age": None, "role": "User",
+}
+
+
+def specialist_rows(n: int) -> list:
+    return [
+        serialize_specialist({
+            "uid": f"{i:032x}",
+            "fname": f"fname{i}",
+            "lname": f"lname{i}",
+            "about": "وکیل پایه یک دادگستری، مشاوره‌ی خانواده و قراردادها" if i % 2 else "maths and physics tutor",
+            "tag": ["law" if i % 2 else "edu"],
+        })
+        for i in range(n)
+    ]
+
+
+def pydantic_body(specialists: list) -> bytes:
+    model = HomeData(
+        current_user=CURRENT_USER,
+        specialists=[SpecialistData(**row) for row in specialists],
+        next_cursor=None,
+    )
+    return json.dumps(
+        jsonable_encoder(model), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode()
+
+
+def map_body(fmt: str, specialists) -> bytes:
+    return encode_map(fmt, {"current_user": CURRENT_USER, "specialists": specialists, "next_cursor": None})
+
+
+def timed(fn, repeat: int) -> tuple:
+    best, body = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return body, best
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--specialists", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20, help="best of N encodes")
+    args = parser.parse_args()
+
+    specialists = specialist_rows(args.specialists)
+    cached = {fmt: Encoded(encode(fmt, specialists)) for fmt in (JSON, MSGPACK)}
+    cases = [
+        ("pydantic json", lambda: pydantic_body(specialists)),
+        ("encode_map json", lambda: map_body(JSON, specialists)),
+        ("encode_map msgpack", lambda: map_body(MSGPACK, specialists)),
+        ("cached json", lambda: map_body(JSON, cached[JSON])),
+        ("cached msgpack", lambda: map_body(MSGPACK, cached[MSGPACK])),
+    ]
+
+    log.info("homepage with %d specialists, best of %d", args.specialists, args.repeat)
+    log.info("%-20s %10s %10s %10s", "", "bytes", "gzip", "encode")
+    for name, fn in cases:
+        body, seconds = timed(fn, args.repeat)
+        log.info("%-20s %10d %10d %8.2fms", name, len(body), len(gzip.compress(body)), seconds * 1000)
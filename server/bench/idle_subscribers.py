@@ -0,0 +1,118 @@
+"""
+Idle /reservation/watch_availability subscribers on one worker: memory per
+subscriber and fan-out latency of one booking to all of them.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.idle_subscribers [--subscribers 10000] [--url URL]
+
+Every subscriber watches the same specialist (the worst case for fan-out).
+Both ends live on this machine, so the open-files limit is raised to the
+hard limit first; 10k subscribers need about 20k descriptors.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+from datetime import timedelta
+
+import httpx
+from websockets.asyncio.client import connect
+
+from bench.common import configure_logging, log, log_latency, seed_specialists, seed_users, serve, tomorrow, unseed
+from bench.concurrency import booking_body
+from database.connection import mongo
+from reservation.slots import DAY_FORMAT, FULL_DAY
+
+CONNECT_BATCH = 500
+DELIVERY_TIMEOUT = 30
+
+
+def raise_open_files_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        return hard
+    return soft
+
+
+async def subscribe(ws_url: str, user: dict, specialist_uid: str):
+    ws = await connect(ws_url, max_queue=None)
+    await ws.send(json.dumps({"uid": user["uid"], "token": user["token"], "specialist_uid": specialist_uid}))
+    snapshot = json.loads(await ws.recv())
+    if snapshot.get("type") != "snapshot":
+        raise RuntimeError(f"unexpected first message {snapshot!r}")
+    return ws
+
+
+async def wait_diff(ws) -> float:
+    while True:
+        message = json.loads(await ws.recv())
+        if message.get("type") == "diff":
+            return time.perf_counter()
+
+
+async def run(server, users: list, specialist_uid: str, subscribers: int, idle: float) -> dict:
+    ws_url = server.url.replace("http", "ws", 1) + "/reservation/watch_availability"
+    rss_before = server.rss_mb()
+    connections = []
+    started = time.perf_counter()
+    try:
+        for start in range(0, subscribers, CONNECT_BATCH):
+            connections.extend(await asyncio.gather(*(
+                subscribe(ws_url, users[i % len(users)], specialist_uid)
+                for i in range(start, min(start + CONNECT_BATCH, subscribers))
+            )))
+        connect_seconds = time.perf_counter() - started
+        await asyncio.sleep(idle)
+        rss_idle = server.rss_mb()
+        feed = server.admin_get("/reservation/availability_feed_stats")
+
+        receivers = [asyncio.create_task(asyncio.wait_for(wait_diff(ws), DELIVERY_TIMEOUT)) for ws in connections]
+        async with httpx.AsyncClient(base_url=server.url, timeout=30) as client:
+            sent = time.perf_counter()
+            response = await client.post("/reservation/set_user_slot", json=booking_body(users[0], 0))
+            response.raise_for_status()
+        results = await asyncio.gather(*receivers, return_exceptions=True)
+    finally:
+        await asyncio.gather(*(ws.close() for ws in connections), return_exceptions=True)
+
+    return {
+        "connect_seconds": connect_seconds,
+        "rss_before": rss_before,
+        "rss_idle": rss_idle,
+        "feed": feed,
+        "delivery": [t - sent for t in results if isinstance(t, float)],
+        "missed": sum(not isinstance(t, float) for t in results),
+    }
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100, help="subscribers share this many logins")
+    parser.add_argument("--idle", type=float, default=5, help="seconds to sit idle before the booking")
+    parser.add_argument("--url", help="use a running server instead of starting one")
+    args = parser.parse_args()
+
+    log.info("open files limit: %d", raise_open_files_limit())
+    mongo.connect()
+    unseed()
+    users = seed_users(args.users)
+    specialist = seed_specialists(1, availability={
+        (tomorrow() + timedelta(days=d)).strftime(DAY_FORMAT): FULL_DAY for d in range(7)
+    })[0]
+    try:
+        with serve(url=args.url) as server:
+            result = asyncio.run(run(server, users, specialist["uid"], args.subscribers, args.idle))
+    finally:
+        unseed()
+
+    log.info("%d subscribers connected in %.1fs", args.subscribers, result["connect_seconds"])
+    if result["rss_before"] is not None:
+        log.info("worker RSS %.0f MB -> %.0f MB idle (%.1f KB per subscriber)",
+                 result["rss_before"], result["rss_idle"],
+                 (result["rss_idle"] - result["rss_before"]) * 1024 / args.subscribers)
+    log.info("feed stats: %s", result["feed"])
+    log_latency("booking -> diff delivered", result["delivery"])
+    log.info("  %d subscribers missed the diff", result["missed"])
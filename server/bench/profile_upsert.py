@@ -0,0 +1,82 @@
+"""
+Round trips and latency per call of the profile write endpoints.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.profile_upsert [--calls 200] [--url URL]
+
+Calls are sequential, so latency is one request's own cost. Mongo commands
+per call come from the route's guidora_http_request_db_commands_total
+counter on /metrics, which includes the auth lookup whenever the role cache
+was just dropped by the previous write. With --url the server must share
+GUIDORA_JWT_SECRET and GUIDORA_ADMIN_KEY with this process.
+"""
+import argparse
+import re
+import time
+
+import httpx
+
+from bench.common import BENCH_ADMIN_KEY, configure_logging, log, log_latency, seed_users, serve, unseed
+from database.connection import mongo
+
+DB_COMMANDS_RE = re.compile(r'^guidora_http_request_db_commands_total\{route="([^"]+)",method="POST"\} (\d+)$', re.M)
+
+
+def set_user_profile_body(user: dict, i: int) -> dict:
+    return {
+        "uid": user["uid"], "token": user["token"], "number": user["number"],
+        "fname": "bench", "lname": f"user{i}", "age": 30, "gender": "female", "tag": ["law"],
+    }
+
+
+def set_spe_profile_body(user: dict, i: int) -> dict:
+    return {
+        "uid": user["uid"], "token": user["token"], "number": user["number"],
+        "fname": "bench", "lname": f"spe{i}", "age": 40, "gender": "male",
+        "educert": "llm", "about": f"revision {i}", "tag": "law",
+    }
+
+
+def set_info_body(user: dict, i: int) -> dict:
+    return {
+        "uid": user["uid"], "token": user["token"], "number": user["number"],
+        "fname": "bench", "lname": f"info{i}", "tag": "edu",
+    }
+
+
+ENDPOINTS = [
+    ("/profile/set_user_profile", set_user_profile_body),
+    ("/profile/set_spe_profile", set_spe_profile_body),
+    ("/auth/set_info", set_info_body),
+]
+
+
+def db_commands(client: httpx.Client) -> dict:
+    return {route: int(n) for route, n in DB_COMMANDS_RE.findall(client.get("/metrics", headers={"X-Admin-Key": BENCH_ADMIN_KEY}).text)}
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200, help="calls per endpoint")
+    parser.add_argument("--users", type=int, default=20, help="the first call per user inserts, the rest update")
+    parser.add_argument("--url", help="use a running server instead of starting one")
+    args = parser.parse_args()
+
+    mongo.connect()
+    unseed()
+    users = seed_users(args.users)
+    try:
+        with serve(url=args.url) as server, httpx.Client(base_url=server.url, timeout=30) as client:
+            for path, make_body in ENDPOINTS:
+                before = db_commands(client).get(path, 0)
+                samples, failed = [], 0
+                for i in range(args.calls):
+                    started = time.perf_counter()
+                    response = client.post(path, json=make_body(users[i % len(users)], i))
+                    samples.append(time.perf_counter() - started)
+                    failed += response.status_code != 200
+                commands = db_commands(client).get(path, 0) - before
+                log_latency(path, samples)
+                log.info("  %.2f Mongo commands per call, %d failed calls", commands / args.calls, failed)
+    finally:
+        unseed()
@@ -0,0 +1,128 @@
+"""
+Legacy chunk strings vs per-day bitmaps: document size and booking latency.
+
+    MONGO_URI=mongodb://localhost/guidora_bench python -m bench.slot_bitmaps [--specialists 10000] [--days 90]
+    python -m bench.slot_bitmaps --size-only
+
+Both layouts are loaded into their own scratch collections (dropped again
+afterwards), every specialist fully available for --days days. Bookings
+pick a random specialist and 1-2 free half hours; the legacy side books the
+way set_user_slot used to (`$all` + `$pullAll` on available_slots), the
+bitmap side with reservation.slots.claim_filter / book_update.
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+import bson
+from bson.int64 import Int64
+from mongoengine import get_db
+from pymongo import ReturnDocument
+
+from bench.common import configure_logging, log, log_latency, tomorrow
+from database.connection import mongo
+from reservation.slots import DAY_FORMAT, FULL_DAY, SLOTS_PER_DAY, book_update, claim_filter, day_masks_to_iso
+
+LEGACY_COLLECTION = "bench_slots_legacy"
+BITMAP_COLLECTION = "bench_slots_bitmap"
+BATCH = 200
+
+
+def day_keys(days: int) -> list:
+    return [(tomorrow() + timedelta(days=d)).strftime(DAY_FORMAT) for d in range(days)]
+
+
+def legacy_doc(i: int, masks: dict) -> dict:
+    return {"uid": f"b{i}", "fname": "bench", "lname": str(i), "available_slots": day_masks_to_iso(masks)}
+
+
+def bitmap_doc(i: int, masks: dict) -> dict:
+    return {
+        "uid": f"b{i}", "fname": "bench", "lname": str(i),
+        "availability": {day: Int64(mask) for day, mask in masks.items()},
+        "booked": {},
+    }
+
+
+def document_sizes(days: int) -> dict:
+    masks = dict.fromkeys(day_keys(days), FULL_DAY)
+    return {"legacy": len(bson.encode(legacy_doc(0, masks))), "bitmap": len(bson.encode(bitmap_doc(0, masks)))}
+
+
+def load(coll, make_doc, specialists: int, masks: dict):
+    coll.drop()
+    for start in range(0, specialists, BATCH):
+        coll.insert_many([make_doc(i, masks) for i in range(start, min(start + BATCH, specialists))])
+    coll.create_index([("fname", 1), ("lname", 1)])
+
+
+def random_request(rng: random.Random, specialists: int, days: list):
+    index = rng.randrange(SLOTS_PER_DAY - 1)
+    return str(rng.randrange(specialists)), {rng.choice(days): (0b11 if rng.random() < 0.5 else 1) << index}
+
+
+def book_legacy(coll, lname: str, day_masks: dict) -> bool:
+    chunks = day_masks_to_iso(day_masks)
+    return coll.find_one_and_update(
+        {"fname": "bench", "lname": lname, "available_slots": {"$all": chunks}},
+        {"$pullAll": {"available_slots": chunks}},
+        projection={"uid": 1},
+        return_document=ReturnDocument.BEFORE,
+    ) is not None
+
+
+def book_bitmap(coll, lname: str, day_masks: dict) -> bool:
+    query = {"fname": "bench", "lname": lname}
+    query.update(claim_filter(day_masks))
+    return coll.find_one_and_update(
+        query, book_update(day_masks), projection={"uid": 1}, return_document=ReturnDocument.BEFORE
+    ) is not None
+
+
+def time_bookings(coll, book, requests: list) -> tuple:
+    samples, ok = [], 0
+    for lname, day_masks in requests:
+        started = time.perf_counter()
+        ok += book(coll, lname, day_masks)
+        samples.append(time.perf_counter() - started)
+    return samples, ok
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--specialists", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--size-only", action="store_true", help="only compare document sizes, no mongod needed")
+    args = parser.parse_args()
+
+    sizes = document_sizes(args.days)
+    log.info("document with %d fully available days: legacy %d bytes, bitmap %d bytes (%.1fx smaller)",
+             args.days, sizes["legacy"], sizes["bitmap"], sizes["legacy"] / sizes["bitmap"])
+    if args.size_only:
+        raise SystemExit(0)
+
+    mongo.connect()
+    db = get_db()
+    days = day_keys(args.days)
+    masks = dict.fromkeys(days, FULL_DAY)
+    rng = random.Random(0)
+    requests = [random_request(rng, args.specialists, days) for _ in range(args.bookings)]
+    try:
+        for name, make_doc, book in (
+            (LEGACY_COLLECTION, legacy_doc, book_legacy),
+            (BITMAP_COLLECTION, bitmap_doc, book_bitmap),
+        ):
+            coll = db[name]
+            started = time.perf_counter()
+            load(coll, make_doc, args.specialists, masks)
+            log.info("%s: loaded %d specialists in %.1fs, %.1f MB on disk", name, args.specialists,
+                     time.perf_counter() - started, db.command("collStats", name)["storageSize"] / 2**20)
+            samples, ok = time_bookings(coll, book, requests)
+            log_latency(f"{name} booking", samples)
+            log.info("  %d of %d bookings succeeded", ok, len(requests))
+    finally:
+        db.drop_collection(LEGACY_COLLECTION)
+        db.drop_collection(BITMAP_COLLECTION)
@@ -0,0 +1,31 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# mongoengine/pymongo are blocking; every query issued from an `async def`
+# handler goes through this bounded pool so the event loop never waits on Mongo.
+try:
+    MONGO_EXECUTOR_THREADS = int(os.environ.get("MONGO_EXECUTOR_THREADS", "32"))
+except ValueError:
+    MONGO_EXECUTOR_THREADS = 32
+
+_executor = ThreadPoolExecutor(
+    max_workers=MONGO_EXECUTOR_THREADS,
+    thread_name_prefix="mongo-io",
+)
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run a blocking database call in the Mongo thread pool and await its result.
+    The caller's contextvars are carried into the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, partial(ctx.run, fn, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True):
+    _executor.shutdown(wait=wait)
@@ -0,0 +1,139 @@
+"""
+Query-plan regression check: explain() every hot router query and fail if
+any of them is answered by a COLLSCAN.
+
+    python -m database.check_query_plans          # against MONGO_URI as-is
+    python -m database.check_query_plans --seed   # insert throwaway docs first
+
+Point MONGO_URI at a local/scratch mongod; --seed inserts PLAN_CHECK_DOCS
+marked documents per collection and deletes them again when done.
+Exit code is 1 when at least one query regressed.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+
+from database.connection import mongo
+from database.database import Appointment, OtpCode, Specialties, TokenRevocation, User
+from reservation.slots import claim_filter
+
+log = logging.getLogger("database.check_query_plans")
+
+PLAN_CHECK_DOCS = 200
+SEED_MARKER = "_plan_check"
+
+# (name, model, filter, sort) — keep in sync with the routers
+QUERIES = [
+    ("send_otp/verify_otp: user by number", User, {"number": "09120000001"}, None),
+    ("verify_otp: consume code", OtpCode, {"number": "09120000001", "code": "12345"}, None),
+    # the two $match branches of auth.identity.identity_pipeline
+    ("auth identity: users branch", User, {"uid": "pc1"}, None),
+    ("auth identity: specialties branch", Specialties, {"uid": "pc1"}, None),
+    ("set_info/homepage: specialist by uid", Specialties, {"uid": "pc1"}, None),
+    # load_specialist sorts by uid so duplicate names resolve the same way every time
+    ("get_spe_info: specialist by name", Specialties, {"fname": "pc", "lname": "1"}, [("uid", 1)]),
+    (
+        "set_user_slot: claim",
+        Specialties,
+        dict({"fname": "pc", "lname": "1"}, **claim_filter({"2030-01-07": 1 << 16})),
+        None,
+    ),
+    ("homepage: catalog page", Specialties, {"uid": {"$gt": "pc1"}}, [("uid", 1)]),
+    ("homepage: catalog page by tag", Specialties, {"tag": "law", "uid": {"$gt": "pc1"}}, [("uid", 1)]),
+    (
+        "auth revocations: incremental refresh",
+        TokenRevocation,
+        {"created_at": {"$gt": datetime(2030, 1, 1)}},
+        [("created_at", 1)],
+    ),
+    (
+        "get_reserved_slots: upcoming appointments",
+        Appointment,
+        {"user_uid": "pc1", "start": {"$gte": datetime(2030, 1, 1)}},
+        [("start", 1)],
+    ),
+    (
+        "specialist_agenda: date range",
+        Appointment,
+        {"specialist_uid": "pc1", "start": {"$gte": datetime(2030, 1, 1), "$lt": datetime(2030, 2, 1)}},
+        [("start", 1)],
+    ),
+    ("del_reserved_slots: cancel by id", Appointment, {"_id": ObjectId(), "user_uid": "pc1"}, None),
+    ("availability index: dirty refresh", Specialties, {"uid": {"$in": ["pc1", "pc2"]}}, None),
+]
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def winning_stages(model, query: dict, sort=None) -> list:
+    cursor = model._get_collection().find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    planner = cursor.explain()["queryPlanner"]
+    return [s for s in _stages(planner["winningPlan"]) if s]
+
+
+def seed(n: int = PLAN_CHECK_DOCS):
+    now = datetime.utcnow()
+    User._get_collection().insert_many([
+        {"uid": f"pc{i}", "number": f"0912{i:07d}", SEED_MARKER: True} for i in range(n)
+    ])
+    Specialties._get_collection().insert_many([
+        {
+            "uid": f"pc{i}", "number": f"0912{i:07d}", "fname": "pc", "lname": str(i),
+            "tag": ["law" if i % 2 else "edu"], SEED_MARKER: True,
+        }
+        for i in range(n)
+    ])
+    OtpCode._get_collection().insert_many([
+        {"number": f"0912{i:07d}", "code": "00000", "created_at": now, SEED_MARKER: True}
+        for i in range(n)
+    ])
+
+
+def unseed():
+    for model in (User, Specialties, OtpCode):
+        model._get_collection().delete_many({SEED_MARKER: True})
+
+
+def check() -> list:
+    failures = []
+    for name, model, query, sort in QUERIES:
+        stages = winning_stages(model, query, sort)
+        ok = "COLLSCAN" not in stages
+        log.info("%-45s %s %s", name, "ok  " if ok else "FAIL", " <- ".join(stages))
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true", help="insert throwaway documents first")
+    args = parser.parse_args()
+
+    mongo.connect()
+    mongo.ensure_indexes()
+    if args.seed:
+        seed()
+    try:
+        failed = check()
+    finally:
+        if args.seed:
+            unseed()
+
+    if failed:
+        log.error("%d queries fell back to a collection scan: %s", len(failed), ", ".join(failed))
+        sys.exit(1)
+    log.info("all %d queries use an index", len(QUERIES))
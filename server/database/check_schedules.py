@@ -0,0 +1,45 @@
+"""
+Consistency check for the materialized User.schedule view: recompute it from
+the appointments collection and report (or rebuild) users whose view differs.
+
+    python -m database.check_schedules [--uid UID] [--repair]
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from database.connection import mongo
+from database.database import Appointment, User
+from reservation.schedule import verify_schedule
+
+log = logging.getLogger("database.check_schedules")
+
+
+def check_schedules(uids=None, repair: bool = False) -> list:
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    if uids is None:
+        # users with a view, plus everyone holding appointments: a failed first
+        # push_schedule leaves schedule_rev at 0 with the bookings already made
+        uids = set(Appointment._get_collection().distinct("user_uid"))
+        uids.update(row["uid"] for row in User._get_collection().find(
+            {"schedule_rev": {"$gt": 0}}, projection={"uid": 1}
+        ))
+        uids = sorted(uids)
+    return [uid for uid in uids if not verify_schedule(uid, today, repair=repair)]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uid", action="append", help="check only this user (repeatable)")
+    parser.add_argument("--repair", action="store_true", help="rebuild views that are out of step")
+    args = parser.parse_args()
+
+    mongo.connect()
+    mismatched = check_schedules(args.uid, repair=args.repair)
+    if mismatched:
+        log.error("%d schedule views out of step%s: %s",
+                  len(mismatched), " (rebuilt)" if args.repair else "", ", ".join(mismatched))
+        sys.exit(0 if args.repair else 1)
+    log.info("all schedule views match their appointments")
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from mongoengine import connect, disconnect, get_db
+from pymongo import monitoring
+
+from database.aio import run_db
+
+log = logging.getLogger("database.connection")
+
+
+MONGO_URI = os.environ.get("MONGO_URI")
+try:
+    MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+except ValueError:
+    MONGO_MAX_POOL_SIZE = 100
+try:
+    MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "10"))
+except ValueError:
+    MONGO_MIN_POOL_SIZE = 10
+try:
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+except ValueError:
+    MONGO_CONNECT_TIMEOUT_MS = 5000
+try:
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+except ValueError:
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+try:
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+except ValueError:
+    MONGO_SOCKET_TIMEOUT_MS = 10000
+try:
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+except ValueError:
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+MONGO_READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters per server, fed by pymongo CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: defaultdict(int))
+
+    def _inc(self, event, key, delta=1):
+        with self._lock:
+            self._counts[f"{event.address[0]}:{event.address[1]}"][key] += delta
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): self._inc(event, "cleared")
+    def pool_closed(self, event): pass
+    def connection_created(self, event): self._inc(event, "open")
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): self._inc(event, "open", -1)
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): self._inc(event, "checkout_failed")
+    def connection_checked_out(self, event): self._inc(event, "in_use")
+    def connection_checked_in(self, event): self._inc(event, "in_use", -1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {addr: dict(c) for addr, c in self._counts.items()}
+
+
+class RequestDbUsage:
+    """Mongo commands issued on behalf of one HTTP request (see metrics.MetricsMiddleware)."""
+
+    __slots__ = ("commands", "seconds")
+
+    def __init__(self):
+        self.commands = 0
+        self.seconds = 0.0
+
+
+# set per request by the metrics middleware; run_db carries it into the Mongo threads
+request_db_usage: contextvars.ContextVar[Optional[RequestDbUsage]] = contextvars.ContextVar(
+    "request_db_usage", default=None
+)
+
+
+class CommandStats(monitoring.CommandListener):
+    """
+    Command counts and server-reported durations per command name, fed by
+    pymongo command monitoring. Events fire in the thread that ran the command,
+    so the calling request's RequestDbUsage is charged as well.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {"commands": 0, "failures": 0, "seconds": 0.0})
+
+    def _record(self, event, failed: bool):
+        seconds = event.duration_micros / 1e6
+        usage = request_db_usage.get()
+        with self._lock:
+            counts = self._counts[event.command_name]
+            counts["commands"] += 1
+            counts["seconds"] += seconds
+            if failed:
+                counts["failures"] += 1
+            if usage is not None:
+                usage.commands += 1
+                usage.seconds += seconds
+
+    def started(self, event): pass
+    def succeeded(self, event): self._record(event, False)
+    def failed(self, event): self._record(event, True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(c) for name, c in self._counts.items()}
+
+
+class MongoManager:
+    """
+    Owns the single mongoengine connection for the process.
+    start() runs from the FastAPI lifespan: connect, ensure indexes, open
+    MONGO_MIN_POOL_SIZE connections, all before the worker accepts traffic.
+    """
+
+    def __init__(self):
+        self.pool_stats = PoolStats()
+        self.command_stats = CommandStats()
+        self.connected = False
+        self.startup_ms = None
+
+    def connect(self):
+        if self.connected:
+            return
+        if not MONGO_URI:
+            raise ValueError("MONGO_URI environment variable is not set!")
+        connect(
+            host=MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            readPreference=MONGO_READ_PREFERENCE,
+            event_listeners=[self.pool_stats, self.command_stats],
+        )
+        self.connected = True
+
+    @staticmethod
+    def sync_ttl(model, field: str, seconds: int):
+        """
+        createIndex refuses to change expireAfterSeconds of an existing index;
+        collMod it in place when the configured TTL changed.
+        """
+        coll = model._get_collection()
+        for name, spec in coll.index_information().items():
+            if spec["key"] == [(field, 1)] and spec.get("expireAfterSeconds") not in (None, seconds):
+                coll.database.command("collMod", coll.name, index={"name": name, "expireAfterSeconds": seconds})
+                log.info("TTL of %s.%s set to %ds", coll.name, name, seconds)
+
+    @classmethod
+    def ensure_indexes(cls):
+        from database.database import User, Specialties, OtpCode, TokenRevocation, Appointment, REVOCATION_TTL
+
+        cls.sync_ttl(TokenRevocation, "created_at", int(REVOCATION_TTL.total_seconds()))
+        for model in (User, Specialties, OtpCode, TokenRevocation, Appointment):
+            model.ensure_indexes()
+
+    @staticmethod
+    def _ping():
+        get_db().command("ping")
+
+    async def warm_up(self, connections: int = MONGO_MIN_POOL_SIZE):
+        # concurrent pings force the pool to open that many sockets up front
+        await asyncio.gather(*(run_db(self._ping) for _ in range(max(1, connections))))
+
+    async def start(self):
+        started = time.perf_counter()
+        self.connect()
+        await run_db(self.ensure_indexes)
+        await self.warm_up()
+        self.startup_ms = (time.perf_counter() - started) * 1000
+        log.info("Mongo ready in %.1f ms", self.startup_ms)
+
+    def stop(self):
+        if self.connected:
+            disconnect()
+            self.connected = False
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "startup_ms": self.startup_ms,
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "pools": self.pool_stats.snapshot(),
+            "commands": self.command_stats.snapshot(),
+        }
+
+
+mongo = MongoManager()
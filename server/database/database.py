@@ -6,23 +6,28 @@ from mongoengine import (
     DateTimeField,
     ListField,
     IntField,
+    LongField,
+    DictField,
+    MapField,
     signals,
     ValidationError,
-    connect
 )
 
 from datetime import datetime, timedelta
 import os, re, uuid
 
-MONGO_URI = os.environ.get("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is not set!")
-connect(host=MONGO_URI)
-
 PHONE_RE = re.compile(r'^09\d{9}$')
 OTP_TTL = timedelta(minutes=3)
 TOKEN_TTL = timedelta(days=3)
 
+try:
+    JWT_TTL = timedelta(days=int(os.environ.get("GUIDORA_JWT_EXPIRE_DAYS", "3")))
+except ValueError:
+    JWT_TTL = timedelta(days=3)
+
+# a revocation must outlive every token it can apply to
+REVOCATION_TTL = max(TOKEN_TTL, JWT_TTL)
+
 def generate_uid():
     return uuid.uuid4().hex
 
@@ -83,20 +88,45 @@ class BaseUser(Document):
             self.gender = self.gender.lower()
 
 class User(BaseUser):
-    meta = {'collection': 'users'}
+    meta = {
+        'collection': 'users',
+        # send_otp / verify_otp look users up by phone number
+        'indexes': ['number'],
+    }
+    # legacy single reservation (chunk strings + one specialist); bookings now live in `appointments`
     appointments = ListField(StringField(), default=list)
     last_specialist_uid = StringField(null=True)
     reserved_specialist_fname = StringField(null=True)
     reserved_specialist_lname = StringField(null=True)
     reserved_specialist_number = StringField(null=True, regex=PHONE_RE)
+    # day -> upcoming appointments ready to serve; see reservation/schedule.py
+    schedule = MapField(ListField(DictField()), default=dict)
+    schedule_rev = IntField(default=0)
+    # bumped on every login/logout; JWTs carry it as the `tv` claim
+    token_version = IntField(default=0)
 
 
 class Specialties(BaseUser):
-    meta = {'collection': 'specialties'}
+    meta = {
+        'collection': 'specialties',
+        'indexes': [
+            # keyset pagination of the homepage list, optionally filtered by tag
+            ('tag', 'uid'),
+            # set_user_slot / get_spe_info address specialists by name
+            ('fname', 'lname'),
+        ],
+    }
     tag = ListField(StringField(), default=list)  
     about = StringField(max_length=250, default="")
     educert = StringField(max_length=150, default="")
+    # legacy: one string per 30-minute chunk; moved into `availability` by database/migrate_slots.py
     available_slots = ListField(StringField())
+    # day ("YYYY-MM-DD") -> 48-bit mask, bit i = chunk starting at i * 30 minutes
+    # date-specific exceptions; a day present here overrides weekly_template (0 = day off)
+    availability = MapField(LongField(), default=dict)
+    # weekday ("0" = Monday ... "6" = Sunday) -> 48-bit mask, repeats every week
+    weekly_template = MapField(LongField(), default=dict)
+    booked = MapField(LongField(), default=dict)
     def clean(self):
         super().clean()
 
@@ -114,5 +144,56 @@ class Specialties(BaseUser):
             raise ValidationError("tag must be 'law' or 'edu'")
         self.tag = [tag_lower] 
 
+class OtpCode(Document):
+    # Mongo's TTL monitor deletes expired codes; verify_otp still enforces OTP_TTL itself
+    # because the monitor only runs about once a minute.
+    meta = {
+        'collection': 'otp_codes',
+        'indexes': [
+            {'fields': ['created_at'], 'expireAfterSeconds': int(OTP_TTL.total_seconds())},
+        ],
+    }
+    number = StringField(required=True, unique=True, regex=PHONE_RE)
+    code = StringField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+class Appointment(Document):
+    # one contiguous booked interval on one day; a booking request spanning several
+    # intervals shares one booking_id
+    meta = {
+        'collection': 'appointments',
+        'indexes': [
+            ('user_uid', 'start'),
+            ('specialist_uid', 'start'),
+            'booking_id',
+        ],
+    }
+    booking_id = StringField(required=True)
+    user_uid = StringField(required=True)
+    specialist_uid = StringField(required=True)
+    # snapshot for display, so listing a user's bookings needs no join
+    specialist_fname = StringField(null=True)
+    specialist_lname = StringField(null=True)
+    specialist_number = StringField(null=True)
+    day = StringField(required=True)
+    # the bits this appointment holds in Specialties.booked[day]
+    mask = LongField(required=True)
+    start = DateTimeField(required=True)
+    end = DateTimeField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+class TokenRevocation(Document):
+    # tokens of `uid` whose `tv` claim is below `min_version` are dead.
+    # events outlive every token they could apply to (REVOCATION_TTL), then the TTL monitor drops them.
+    meta = {
+        'collection': 'token_revocations',
+        'indexes': [
+            {'fields': ['created_at'], 'expireAfterSeconds': int(REVOCATION_TTL.total_seconds())},
+        ],
+    }
+    uid = StringField(required=True)
+    min_version = IntField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
 signals.pre_save.connect(_pre_save_update_timestamp, sender=User)
 signals.pre_save.connect(_pre_save_update_timestamp, sender=Specialties)
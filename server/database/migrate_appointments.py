@@ -0,0 +1,90 @@
+"""
+One-off migration: the legacy single reservation on User (appointments chunk
+strings + last_specialist_uid / reserved_specialist_*) -> Appointment rows,
+bits in the specialist's `booked` map and the user's schedule view.
+
+    python -m database.migrate_appointments
+
+Legacy bookings took their chunks out of the specialist's free slots, so the
+bits are set in both `availability` and `booked`: the slot stays taken, and
+cancelling it gives it back like any new booking. Safe to re-run: a user's
+rows use the booking id "legacy-<uid>" and are only inserted once.
+"""
+import logging
+from datetime import datetime
+
+from bson.int64 import Int64
+
+from database.database import Appointment, Specialties, User
+from database.connection import mongo
+from reservation.booking import SPECIALIST_BOOKING_FIELDS, appointment_docs
+from reservation.schedule import rebuild_schedule
+from reservation.slots import iso_to_day_masks
+
+log = logging.getLogger("database.migrate_appointments")
+
+LEGACY_FIELDS = {
+    "uid": 1,
+    "appointments": 1,
+    "last_specialist_uid": 1,
+    "reserved_specialist_fname": 1,
+    "reserved_specialist_lname": 1,
+    "reserved_specialist_number": 1,
+}
+LEGACY_UNSET = {field: "" for field in LEGACY_FIELDS if field != "uid"}
+
+
+def legacy_specialist(user: dict):
+    coll = Specialties._get_collection()
+    if user.get("last_specialist_uid"):
+        specialist = coll.find_one({"uid": user["last_specialist_uid"]}, projection=SPECIALIST_BOOKING_FIELDS)
+        if specialist:
+            return specialist
+    fname, lname = user.get("reserved_specialist_fname"), user.get("reserved_specialist_lname")
+    if fname and lname:
+        return coll.find_one({"fname": fname.lower(), "lname": lname.lower()}, projection=SPECIALIST_BOOKING_FIELDS)
+    return None
+
+
+def migrate_user(user: dict, today: str) -> bool:
+    """False if the specialist can no longer be found; the legacy fields are then left alone."""
+    specialist = legacy_specialist(user)
+    if specialist is None:
+        log.warning("Skipping %s: specialist of the legacy reservation not found", user["uid"])
+        return False
+
+    day_masks = iso_to_day_masks(user.get("appointments") or [])
+    booking_id = f"legacy-{user['uid']}"
+    if day_masks and Appointment._get_collection().find_one({"booking_id": booking_id}, projection={"_id": 1}) is None:
+        # the row snapshot keeps the name / number the user booked with
+        specialist = dict(
+            specialist,
+            fname=specialist.get("fname") or user.get("reserved_specialist_fname"),
+            lname=specialist.get("lname") or user.get("reserved_specialist_lname"),
+            number=specialist.get("number") or user.get("reserved_specialist_number"),
+        )
+        Appointment._get_collection().insert_many(appointment_docs(booking_id, user["uid"], specialist, day_masks))
+    if day_masks:
+        # $bit or is idempotent, so a re-run after a crash here is harmless
+        bits = {}
+        for day, mask in day_masks.items():
+            bits[f"availability.{day}"] = {"or": Int64(mask)}
+            bits[f"booked.{day}"] = {"or": Int64(mask)}
+        Specialties._get_collection().update_one({"uid": specialist["uid"]}, {"$bit": bits})
+
+    if not rebuild_schedule(user["uid"], today):
+        log.warning("Schedule view of %s changed meanwhile; run check_schedules --repair", user["uid"])
+    User._get_collection().update_one({"uid": user["uid"]}, {"$unset": LEGACY_UNSET})
+    return True
+
+
+def migrate_appointments() -> int:
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    cursor = User._get_collection().find({"appointments.0": {"$exists": True}}, projection=LEGACY_FIELDS)
+    return sum(migrate_user(user, today) for user in cursor)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    mongo.connect()
+    log.info("Migrated the legacy reservations of %d users", migrate_appointments())
@@ -0,0 +1,53 @@
+"""
+One-off migration: Specialties.available_slots (one string per 30-minute chunk)
+-> Specialties.availability (one 48-bit mask per day).
+
+    python -m database.migrate_slots
+"""
+import logging
+
+from bson.int64 import Int64
+from pymongo import UpdateOne
+
+from database.database import Specialties
+from database.connection import mongo
+from reservation.slots import iso_to_day_masks
+
+log = logging.getLogger("database.migrate_slots")
+
+BATCH_SIZE = 500
+
+
+def migrate_available_slots(batch_size: int = BATCH_SIZE) -> int:
+    coll = Specialties._get_collection()
+    cursor = coll.find(
+        {"available_slots.0": {"$exists": True}},
+        projection={"available_slots": 1, "availability": 1},
+    )
+
+    ops, migrated = [], 0
+    for doc in cursor:
+        masks = iso_to_day_masks(doc.get("available_slots") or [])
+        for day, mask in (doc.get("availability") or {}).items():
+            masks[day] = masks.get(day, 0) | mask
+
+        ops.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {
+                "$set": {"availability": {day: Int64(mask) for day, mask in masks.items()}},
+                "$unset": {"available_slots": 1},
+            },
+        ))
+        if len(ops) >= batch_size:
+            migrated += coll.bulk_write(ops, ordered=False).modified_count
+            ops = []
+
+    if ops:
+        migrated += coll.bulk_write(ops, ordered=False).modified_count
+    return migrated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    mongo.connect()
+    log.info("Migrated %d specialists", migrate_available_slots())
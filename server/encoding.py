@@ -0,0 +1,72 @@
+"""
+Response bodies in the format the client asks for with `Accept`:
+MessagePack (application/msgpack) or compact JSON (the default).
+Handlers that return negotiated_response() skip FastAPI's response_model
+pass, so their dicts must already have the documented shape.
+"""
+import json
+
+from fastapi import Request, Response
+
+try:
+    import msgpack
+except ImportError:  # بدون msgpack همه‌ی پاسخ‌ها JSON می‌مانند
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+MEDIA_TYPES = {JSON: "application/json", MSGPACK: "application/msgpack"}
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class Encoded(bytes):
+    """A value already encoded in the response's format; encode_map() splices it in as is."""
+
+
+def negotiate(request: Request) -> str:
+    """MSGPACK if the client accepts one of its media types (q > 0), otherwise JSON."""
+    if msgpack is None:
+        return JSON
+    for item in request.headers.get("accept", "").lower().split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        if media_type not in MSGPACK_MEDIA_TYPES:
+            continue
+        q = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            if float(q) > 0:
+                return MSGPACK
+        except ValueError:
+            continue
+    return JSON
+
+
+def encode(fmt: str, content) -> bytes:
+    if fmt == MSGPACK:
+        return msgpack.packb(content, default=str, use_bin_type=True)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+def encode_map(fmt: str, fields: dict) -> bytes:
+    """Encode a flat dict whose values may be Encoded fragments (e.g. a cached list)."""
+    parts = []
+    for key, value in fields.items():
+        parts.append(encode(fmt, key))
+        parts.append(value if isinstance(value, Encoded) else encode(fmt, value))
+    if fmt == MSGPACK:
+        return msgpack.Packer().pack_map_header(len(fields)) + b"".join(parts)
+    return b"{" + b",".join(parts[i] + b":" + parts[i + 1] for i in range(0, len(parts), 2)) + b"}"
+
+
+def negotiated_response(
+    request: Request, content: dict, status_code: int = 200, headers: dict = None, fmt: str = None
+) -> Response:
+    fmt = fmt or negotiate(request)
+    response = Response(
+        content=encode_map(fmt, content),
+        status_code=status_code,
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
+    )
+    response.headers["Vary"] = "Accept"
+    return response
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from database.database import Specialties
+from database.aio import run_db
+from encoding import Encoded, encode
+
+log = logging.getLogger(__name__)
+
+try:
+    CATALOG_MAX_AGE = float(os.environ.get("CATALOG_MAX_AGE", "30"))
+except ValueError:
+    CATALOG_MAX_AGE = 30.0
+
+try:
+    CATALOG_REFRESH_TIMEOUT = float(os.environ.get("CATALOG_REFRESH_TIMEOUT", "0.5"))
+except ValueError:
+    CATALOG_REFRESH_TIMEOUT = 0.5
+
+try:
+    CATALOG_MAX_PAGES = int(os.environ.get("CATALOG_MAX_PAGES", "256"))
+except ValueError:
+    CATALOG_MAX_PAGES = 256
+
+# فقط فیلدهایی که SpecialistData واقعا پر می‌کند از دیتابیس خوانده می‌شوند
+SPECIALIST_LIST_FIELDS = ("uid", "fname", "lname", "tag", "about")
+
+
+def fetch_specialists_page(tag: Optional[str], cursor: Optional[str], limit: int):
+    """
+    Keyset page over specialists ordered by uid.
+    Served by the unique uid index, or the (tag, uid) index when filtering by tag.
+    """
+    query = {}
+    if tag:
+        query["tag"] = tag
+    if cursor:
+        query["uid__gt"] = cursor
+
+    rows = list(
+        Specialties.objects(**query)
+        .only(*SPECIALIST_LIST_FIELDS)
+        .order_by("uid")
+        .limit(limit + 1)
+        .as_pymongo()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]["uid"]
+    return rows, next_cursor
+
+
+def serialize_specialist(row: dict) -> dict:
+    return {
+        "uid": str(row["uid"]),
+        "fname": row.get("fname", ""),
+        "lname": row.get("lname", ""),
+        "age": None,
+        "gender": "",
+        "number": "",
+        "educert": "",
+        "about": row.get("about", ""),
+        "tag": row.get("tag", []),
+    }
+
+
+@dataclass
+class CatalogPage:
+    version: int
+    built_at: float
+    specialists: list
+    next_cursor: Optional[str]
+    etag: str
+    _encoded: dict = field(default_factory=dict, repr=False)
+
+    def encoded_specialists(self, fmt: str) -> Encoded:
+        """The specialists list encoded once per format and reused by every response for this page."""
+        encoded = self._encoded.get(fmt)
+        if encoded is None:
+            encoded = self._encoded[fmt] = Encoded(encode(fmt, self.specialists))
+        return encoded
+
+
+class SpecialistCatalog:
+    """
+    Versioned in-memory snapshot of serialized homepage pages.
+    Profile write paths call bump(); a page older than the current version
+    (or CATALOG_MAX_AGE, which covers writes made by other workers) is rebuilt.
+    While a rebuild is slower than CATALOG_REFRESH_TIMEOUT the stale page is served.
+    """
+
+    def __init__(self, max_age: float, refresh_timeout: float, max_pages: int):
+        self.max_age = max_age
+        self.refresh_timeout = refresh_timeout
+        self.max_pages = max_pages
+        self.version = 0
+        self._pages: "OrderedDict[tuple, CatalogPage]" = OrderedDict()
+        self._refreshing: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+
+    def bump(self):
+        self.version += 1
+
+    def _is_fresh(self, page: CatalogPage) -> bool:
+        return page.version == self.version and time.monotonic() - page.built_at < self.max_age
+
+    async def _build(self, key: tuple) -> CatalogPage:
+        version = self.version
+        tag, cursor, limit = key
+        rows, next_cursor = await run_db(fetch_specialists_page, tag, cursor, limit)
+        specialists = [serialize_specialist(row) for row in rows]
+        digest = hashlib.sha1(
+            json.dumps([specialists, next_cursor], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        page = CatalogPage(version, time.monotonic(), specialists, next_cursor, digest)
+
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return page
+
+    def _refresh_task(self, key: tuple) -> asyncio.Task:
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._build(key))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda t: self._finish_refresh(key, t))
+        return task
+
+    def _finish_refresh(self, key: tuple, task: asyncio.Task):
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Catalog refresh failed: %s", task.exception())
+
+    async def get_page(self, tag: Optional[str], cursor: Optional[str], limit: int) -> CatalogPage:
+        key = (tag.strip().lower() if tag else None, cursor, limit)
+        page = self._pages.get(key)
+        if page and self._is_fresh(page):
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+        self.misses += 1
+        task = self._refresh_task(key)
+        if page is None:
+            return await asyncio.shield(task)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.refresh_timeout)
+        except Exception:
+            # Mongo is slow or failing: serve the previous snapshot, refresh keeps running
+            self.stale_served += 1
+            return page
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "pages": len(self._pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+        }
+
+
+catalog = SpecialistCatalog(CATALOG_MAX_AGE, CATALOG_REFRESH_TIMEOUT, CATALOG_MAX_PAGES)
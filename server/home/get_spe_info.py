@@ -1,51 +1,71 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from mongoengine import connect, DoesNotExist
+from typing import Optional
 import os
-import json
-from database.database import User, Specialties
+from datetime import datetime, timedelta
+from database.database import Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.slots import day_masks_to_iso, free_masks
+from home.search_index import PUBLIC_PROFILE_FIELDS, public_profile
 
 router = APIRouter()
 
-MONGO_URI = os.environ.get("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is not set!")
+try:
+    AVAILABILITY_HORIZON_DAYS = int(os.environ.get("AVAILABILITY_HORIZON_DAYS", "30"))
+except ValueError:
+    AVAILABILITY_HORIZON_DAYS = 30
 
-connect(host=MONGO_URI)
+AVAILABILITY_FIELDS = ("availability", "weekly_template", "booked")
 
 class SpecialistSearchRequest(BaseModel):
     uid: str
-    jwt: str
-    fname: str
-    lname: str
+    # احراز هویت با require_auth است (token یا نام قدیمی jwt)؛ در /batch هیچ‌کدام لازم نیست
+    token: Optional[str] = None
+    jwt: Optional[str] = None
+    # ترجیحا با uid (از نتیجه‌ی /home/search_specialists)؛ نام فقط برای سازگاری با کلاینت‌های قدیمی
+    specialist_uid: Optional[str] = None
+    fname: Optional[str] = None
+    lname: Optional[str] = None
 
-def verify_token_globally(uid: str, token: str) -> bool:
-
-    for model in [User, Specialties]:
-        try:
-            target_user = model.objects.get(uid=uid)
-            if hasattr(target_user, 'token_value') and target_user.token_value == token:
-                return True
-        except DoesNotExist:
-            continue
-    return False
+def load_specialist(data: SpecialistSearchRequest) -> Optional[dict]:
+    if data.specialist_uid:
+        query = {"uid": data.specialist_uid}
+    else:
+        query = {"fname": (data.fname or "").lower(), "lname": (data.lname or "").lower()}
+    # فقط پروفایل عمومی + بیت‌مپ‌ها؛ token و otp هرگز خوانده نمی‌شوند
+    return (
+        Specialties.objects(**query)
+        .only(*PUBLIC_PROFILE_FIELDS, *AVAILABILITY_FIELDS)
+        .order_by("uid")
+        .as_pymongo()
+        .first()
+    )
 
 @router.post("/get_spe_info")
-async def get_specialist_info(data: SpecialistSearchRequest):
-    if not verify_token_globally(data.uid, data.jwt):
-        raise HTTPException(status_code=401, detail="Unauthorized: invalid token or UID not found")
+async def get_specialist_info(data: SpecialistSearchRequest, auth: AuthContext = Depends(require_auth)):
+    if not data.specialist_uid and not (data.fname and data.lname):
+        raise HTTPException(status_code=400, detail="specialist_uid or fname and lname are required")
 
     try:
-        specialist = Specialties.objects.get(fname=data.fname, lname=data.lname)
-        
-        specialist_data = specialist.to_mongo().to_dict()
-        
-        if "_id" in specialist_data:
-            specialist_data["_id"] = str(specialist_data["_id"])
-
-        return specialist_data
+        row = await run_db(load_specialist, data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
-    except DoesNotExist:
+    if not row:
         raise HTTPException(status_code=404, detail="Specialist with these names not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
\ No newline at end of file
+
+    specialist_data = public_profile(row)
+
+    # خروجی قبلی (لیست رشته‌ها) از روی بیت‌مپ‌ها ساخته می‌شود؛
+    # برنامه‌ی هفتگی از امروز تا افق مشخص باز می‌شود
+    availability = row.get("availability") or {}
+    template = row.get("weekly_template") or {}
+    booked = row.get("booked") or {}
+    start = datetime.utcnow().date()
+    end = start + timedelta(days=AVAILABILITY_HORIZON_DAYS)
+    specialist_data["available_slots"] = day_masks_to_iso(
+        free_masks(availability, booked, template, start, end)
+    )
+
+    return specialist_data
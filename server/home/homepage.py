@@ -1,16 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional, Union
 import os
+import json
+import hashlib
 import logging
-from database.database import User, Specialties
+from database.database import User
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth, resolve_role
+from auth.identity import ROLE_SPECIALIST
+from home.catalog import catalog
+from encoding import JSON, negotiate, negotiated_response
 
 log = logging.getLogger(__name__)
 router = APIRouter()
 
+try:
+    HOMEPAGE_PAGE_SIZE = int(os.environ.get("HOMEPAGE_PAGE_SIZE", "50"))
+except ValueError:
+    HOMEPAGE_PAGE_SIZE = 50
+
+try:
+    HOMEPAGE_MAX_PAGE_SIZE = int(os.environ.get("HOMEPAGE_MAX_PAGE_SIZE", "200"))
+except ValueError:
+    HOMEPAGE_MAX_PAGE_SIZE = 200
+
 class CurrentUser_info(BaseModel):
     uid: str
     token: str
+    cursor: Optional[str] = None
+    limit: Optional[int] = None
+    tag: Optional[str] = None
 
 class SpecialistData(BaseModel):
     uid: str
@@ -35,56 +55,78 @@ class UserData(BaseModel):
 class HomeData(BaseModel):
     current_user: Union[UserData, SpecialistData]
     specialists: List[SpecialistData]
+    next_cursor: Optional[str] = None
 
 @router.post("/homepage", response_model=HomeData)
-async def get_home_data(CurrentUser: CurrentUser_info):
+async def get_home_data(
+    CurrentUser: CurrentUser_info,
+    request: Request,
+    auth: AuthContext = Depends(require_auth)
+):
     try:
         # --- اصلاح اصلی اینجاست ---
         # به جای pk از فیلد uid استفاده می‌کنیم تا با رشته 32 کاراکتری سازگار باشد
-        user = User.objects(uid=CurrentUser.uid).first()
+        # فقط فیلدهای پاسخ؛ schedule و بقیه‌ی سند decode نمی‌شوند
+        user = await run_db(User.objects(uid=CurrentUser.uid).only("uid", "number", "fname", "lname").first)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if getattr(user, "token", "") != CurrentUser.token:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        # بررسی وجود در جدول متخصصین بر اساس uid اختصاصی
-        specialist_record = Specialties.objects(uid=user.uid).first()
-        is_specialist = specialist_record is not None
-        role_type = "specialist" if is_specialist else "user"
+        # نقش کاربر را احراز هویت (require_auth) از قبل مشخص کرده است
+        role_type = await resolve_role(auth)
 
-        if role_type == "specialist":
-            # استفاده از user.uid به جای user.id برای جلوگیری از خطای ObjectId
-            user_info = SpecialistData(
-                uid=str(user.uid), 
-                fname=getattr(user, "fname", ""),
-                lname=getattr(user, "lname", ""),
-                tag=getattr(user, "tag", []),
-                about=getattr(user, "about", "")
-            )
+        # دیکشنری ساده با همان شکل SpecialistData / UserData؛ پاسخ مستقیم
+        # encode می‌شود و response_model فقط برای مستندات باقی مانده است
+        if role_type == ROLE_SPECIALIST:
+            user_info = {
+                "uid": str(user.uid),
+                "fname": getattr(user, "fname", ""),
+                "lname": getattr(user, "lname", ""),
+                "age": None,
+                "gender": "",
+                "number": "",
+                "educert": "",
+                "about": getattr(user, "about", ""),
+                "tag": getattr(user, "tag", []),
+            }
         else:
-            user_info = UserData(
-                uid=str(user.uid),
-                number=user.number,
-                fname=getattr(user, "fname", ""),
-                lname=getattr(user, "lname", ""),
-                role=role_type
-            )
+            user_info = {
+                "uid": str(user.uid),
+                "number": user.number,
+                "fname": getattr(user, "fname", ""),
+                "lname": getattr(user, "lname", ""),
+                "gender": "",
+                "age": None,
+                "role": role_type,
+            }
+
+        # دریافت یک صفحه از متخصصین (صفحه‌بندی بر اساس cursor)
+        limit = CurrentUser.limit or HOMEPAGE_PAGE_SIZE
+        limit = max(1, min(limit, HOMEPAGE_MAX_PAGE_SIZE))
+        page = await catalog.get_page(CurrentUser.tag, CurrentUser.cursor, limit)
+
+        # ETag = نسخه‌ی لیست متخصصین + اطلاعات کاربر فعلی
+        user_digest = hashlib.sha1(
+            json.dumps(user_info, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        fmt = negotiate(request)
+        # هر قالب پاسخ ETag خودش را دارد (Vary: Accept)
+        suffix = "" if fmt == JSON else f"-{fmt}"
+        etag = f'"{page.etag[:16]}-{user_digest[:16]}{suffix}"'
 
-        # دریافت لیست تمام متخصصین
-        all_specialists = Specialties.objects().all()
-        specialist_list = [
-            SpecialistData(
-                uid=str(sp.uid), # اینجا هم از uid استفاده کنید
-                fname=getattr(sp, "fname", ""),
-                lname=getattr(sp, "lname", ""),
-                tag=getattr(sp, "tag", []),
-                about=getattr(sp, "about", "")
-            ) for sp in all_specialists
-        ]
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
 
-        return {"current_user": user_info, "specialists": specialist_list}
+        return negotiated_response(
+            request,
+            {
+                "current_user": user_info,
+                "specialists": page.encoded_specialists(fmt),
+                "next_cursor": page.next_cursor
+            },
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+            fmt=fmt,
+        )
 
     except HTTPException as he:
         # خطاهای HTTP (مثل 401 و 404) را دوباره پرتاب می‌کنیم
@@ -0,0 +1,203 @@
+import heapq
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from database.database import Specialties
+from refreshing_index import RefreshingIndex
+
+log = logging.getLogger(__name__)
+
+try:
+    SEARCH_INDEX_MAX_AGE = float(os.environ.get("SEARCH_INDEX_MAX_AGE", "300"))
+except ValueError:
+    SEARCH_INDEX_MAX_AGE = 300.0
+
+# share of a query word's n-grams a field word must contain (lower = more typo tolerant)
+try:
+    SEARCH_MIN_SIMILARITY = float(os.environ.get("SEARCH_MIN_SIMILARITY", "0.6"))
+except ValueError:
+    SEARCH_MIN_SIMILARITY = 0.6
+
+# چیزی که هر کاربری می‌تواند از پروفایل متخصص ببیند (بدون token، otp، شماره و اسلات‌ها)
+PUBLIC_PROFILE_FIELDS = ("uid", "fname", "lname", "gender", "age", "about", "educert", "tag")
+NAME_FIELDS = ("fname", "lname")
+TEXT_FIELDS = ("about", "educert", "tag")
+# a name match counts this much more than a match in about / educert / tag
+NAME_WEIGHT = 3
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def public_profile(row: dict) -> dict:
+    return {field: row.get(field) for field in PUBLIC_PROFILE_FIELDS}
+
+
+def words(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return _WORD_RE.findall(str(value or "").lower())
+
+
+def word_grams(word: str) -> Set[str]:
+    """
+    Trigrams of "$" + word: the first one ("$ab") anchors prefixes, the rest
+    give typo tolerance. A single letter only has its "$$a" gram.
+    """
+    if len(word) == 1:
+        return {"$$" + word}
+    padded = "$" + word
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def field_grams(row: dict, fields) -> Set[str]:
+    grams: Set[str] = set()
+    for field in fields:
+        for word in words(row.get(field)):
+            grams |= word_grams(word)
+            grams.add("$$" + word[0])
+    return grams
+
+
+def fetch_rows(uids: Optional[List[str]] = None) -> list:
+    query = {"uid__in": uids} if uids is not None else {}
+    return list(Specialties.objects(**query).only(*PUBLIC_PROFILE_FIELDS).as_pymongo())
+
+
+class SpecialistSearchIndex(RefreshingIndex):
+    """
+    In-memory n-gram postings over specialists' names, about, educert and tag.
+    Kept fresh as described in RefreshingIndex (full rebuild every
+    SEARCH_INDEX_MAX_AGE seconds).
+    """
+
+    name = "Search index"
+
+    def __init__(self, max_age: float):
+        super().__init__(max_age)
+        self._reset()
+
+    def fetch(self, uids: Optional[List[str]] = None) -> list:
+        return fetch_rows(uids)
+
+    def _reset(self):
+        self._profiles: Dict[str, dict] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._name_grams: Dict[str, Set[str]] = {}
+        self._doc_grams: Dict[str, tuple] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+
+    def _remove(self, uid: str):
+        profile = self._profiles.pop(uid, None)
+        if profile is None:
+            return
+        all_grams, name_grams = self._doc_grams.pop(uid)
+        for gram in all_grams:
+            self._grams[gram].discard(uid)
+        for gram in name_grams:
+            self._name_grams[gram].discard(uid)
+        for tag in profile.get("tag") or []:
+            self._by_tag.get(tag, set()).discard(uid)
+
+    def _put(self, row: dict):
+        uid = row["uid"]
+        self._remove(uid)
+        profile = public_profile(row)
+        name_grams = field_grams(row, NAME_FIELDS)
+        all_grams = name_grams | field_grams(row, TEXT_FIELDS)
+        self._profiles[uid] = profile
+        self._doc_grams[uid] = (all_grams, name_grams)
+        for gram in all_grams:
+            self._grams.setdefault(gram, set()).add(uid)
+        for gram in name_grams:
+            self._name_grams.setdefault(gram, set()).add(uid)
+        for tag in profile.get("tag") or []:
+            self._by_tag.setdefault(tag, set()).add(uid)
+
+    def _match_word(self, word: str, candidates: Optional[Set[str]]) -> Dict[str, int]:
+        """uid -> score for profiles matching one query word, optionally among `candidates` only."""
+        grams = sorted(word_grams(word), key=lambda g: len(self._grams.get(g, ())))
+        postings = [self._grams.get(g, set()) for g in grams]
+        name_postings = [self._name_grams.get(g, set()) for g in grams]
+
+        if len(grams) == 1:
+            # single letter: membership is the match, no counting needed
+            matched = postings[0] if candidates is None else postings[0] & candidates
+            names = name_postings[0] & matched
+            return dict.fromkeys(matched, 1) | dict.fromkeys(names, NAME_WEIGHT)
+
+        needed = max(1, math.ceil(len(grams) * SEARCH_MIN_SIMILARITY))
+        if needed == len(grams):
+            # every gram required: a plain set intersection, smallest posting first
+            matched = set.intersection(*postings) if candidates is None else set.intersection(candidates, *postings)
+            hits = dict.fromkeys(matched, len(grams))
+        else:
+            # a profile with `needed` of the grams holds at least one of the
+            # len - needed + 1 rarest ones, so only their postings are scanned
+            pool = set().union(*postings[:len(grams) - needed + 1])
+            if candidates is not None:
+                pool &= candidates
+            counts = Counter()
+            for posting in postings:
+                counts.update(pool & posting)
+            hits = {uid: n for uid, n in counts.items() if n >= needed}
+
+        name_hits = Counter()
+        matched = hits.keys()
+        for posting in name_postings:
+            name_hits.update(posting & matched)
+        return {uid: n + (NAME_WEIGHT - 1) * name_hits[uid] for uid, n in hits.items()}
+
+    def search(self, query: str, tag: Optional[str], limit: int) -> List[dict]:
+        """
+        Every query word must match (prefix or typo-tolerant) some word of the
+        profile; ranked by matched n-grams with name matches weighted up.
+        """
+        # rarest-looking (longest) words first: they shrink the candidate set fastest
+        query_words = sorted(set(words(query)), key=len, reverse=True)
+        if not query_words:
+            return []
+
+        candidates = self._by_tag.get(tag.lower(), set()) if tag else None
+
+        # fast path for busy prefixes: when at least `limit` profiles hold every
+        # gram of every word in their name, they share the top score
+        best_names = candidates
+        for word in query_words:
+            name_postings = [self._name_grams.get(g, set()) for g in word_grams(word)]
+            best_names = set.intersection(*name_postings) if best_names is None else best_names.intersection(*name_postings)
+        if len(best_names) >= limit:
+            top = NAME_WEIGHT * sum(len(word_grams(word)) for word in query_words)
+            return [dict(self._profiles[uid], score=top) for uid in heapq.nsmallest(limit, best_names)]
+
+        scores: Dict[str, int] = {}
+        for pos, word in enumerate(query_words):
+            word_scores = self._match_word(word, candidates)
+            if pos == 0:
+                scores = word_scores
+            else:
+                scores = {uid: s + word_scores[uid] for uid, s in scores.items() if uid in word_scores}
+            if not scores:
+                return []
+            candidates = set(scores)
+
+        if len(scores) > limit:
+            # cheap cut before the ordered pick: keep only the best score levels
+            threshold = heapq.nlargest(limit, scores.values())[-1]
+            scores = {uid: s for uid, s in scores.items() if s >= threshold}
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [dict(self._profiles[uid], score=score) for uid, score in best]
+
+    def stats(self) -> dict:
+        return {
+            "specialists": len(self._profiles),
+            "grams": len(self._grams),
+            "dirty": len(self._dirty),
+            "age": self.age(),
+        }
+
+
+search_index = SpecialistSearchIndex(SEARCH_INDEX_MAX_AGE)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from auth.dependencies import AuthContext, require_admin, require_auth
+from home.search_index import search_index
+
+router = APIRouter()
+
+SEARCH_SPECIALISTS_MAX_RESULTS = 50
+
+class SpecialistSearchQuery(BaseModel):
+    uid: str
+    token: str
+    q: str
+    tag: Optional[str] = None
+    limit: int = 20
+
+# جستجوی پیشوندی / مقاوم به غلط تایپی روی نام، درباره، مدرک و تگ
+@router.post("/search_specialists")
+async def search_specialists(data: SpecialistSearchQuery, auth: AuthContext = Depends(require_auth)):
+    if not data.q.strip():
+        raise HTTPException(status_code=400, detail="q is required")
+
+    await search_index.ensure_fresh()
+    limit = max(1, min(data.limit, SEARCH_SPECIALISTS_MAX_RESULTS))
+    return {"results": search_index.search(data.q, data.tag, limit)}
+
+@router.get("/search_index_stats", dependencies=[Depends(require_admin)])
+async def search_index_stats():
+    return search_index.stats()
@@ -1,20 +1,50 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from database.aio import shutdown_executor
+from database.connection import mongo
+from auth.sms_provider import sms_client
+from auth.revocations import revocations
+from auth.dependencies import check_config as check_auth_config, require_admin
+from reservation.availability_feed import availability_feed
+from metrics import MetricsMiddleware, metrics
 
-app = FastAPI(title="Guidora App")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # تنظیمات ضروری، اتصال، ساخت ایندکس‌ها و گرم کردن pool قبل از پذیرش درخواست
+    check_auth_config()
+    await mongo.start()
+    await revocations.start()
+    await availability_feed.start()
+    yield
+    await availability_feed.stop()
+    await revocations.stop()
+    await sms_client.aclose()
+    mongo.stop()
+    shutdown_executor()
+
+app = FastAPI(title="Guidora App", lifespan=lifespan)
+# زمان پاسخ، درخواست‌های در جریان و زمان Mongo به تفکیک route (GET /metrics)
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Guidora API! Navidsec Inc."}
 
+@app.get("/db_stats", dependencies=[Depends(require_admin)])
+def db_stats():
+    return mongo.stats()
+
 # --- Auth Routers ---
 from auth.send_otp import router as send_otp_router
 from auth.verify_otp import router as verify_otp_router
 from auth.set_info import router as set_info_router
 from auth.check_jwt import router as check_jwt_router
+from auth.logout import router as logout_router
 
 # --- Home Routers ---
 from home.homepage import router as homepage_router
 from home.get_spe_info import router as get_spe_info_router
+from home.search_specialists import router as search_specialists_router
 
 # --- Profile Routers ---
 from profile.set_spe_profile import router as spe_profile_router
@@ -25,6 +55,18 @@ from reservation.set_spe_avi_slots import router as spe_slots_router
 from reservation.set_user_slot import router as user_slots_router
 from reservation.get_reserved_slots import router as get_reserved_slots_router
 from reservation.del_reserved_slots import router as del_reserved_slots_router  # <-- اصلاح شد
+from reservation.set_spe_weekly_template import router as spe_template_router
+from reservation.get_free_slots import router as get_free_slots_router
+from reservation.search_available import router as search_available_router
+from reservation.bulk_set_availability import router as bulk_availability_router
+from reservation.specialist_agenda import router as specialist_agenda_router
+from reservation.watch_availability import router as watch_availability_router
+
+# --- Batch ---
+from batch import router as batch_router
+
+# --- Metrics ---
+from metrics import router as metrics_router
 
 # --- Include Routers ---
 
@@ -33,10 +75,12 @@ app.include_router(send_otp_router, prefix="/auth", tags=["Auth"])
 app.include_router(verify_otp_router, prefix="/auth", tags=["Auth"])
 app.include_router(set_info_router, prefix="/auth", tags=["Auth"])
 app.include_router(check_jwt_router, prefix="/auth", tags=["Auth"])
+app.include_router(logout_router, prefix="/auth", tags=["Auth"])
 
 # Home routes
 app.include_router(homepage_router, prefix="/home", tags=["Home"])
 app.include_router(get_spe_info_router, prefix="/home", tags=["Home"]) 
+app.include_router(search_specialists_router, prefix="/home", tags=["Home"])
 
 # Profile routes
 app.include_router(spe_profile_router, prefix="/profile", tags=["Profile"])
@@ -47,3 +91,31 @@ app.include_router(spe_slots_router, prefix="/reservation", tags=["Reservation"]
 app.include_router(user_slots_router, prefix="/reservation", tags=["Reservation"])
 app.include_router(get_reserved_slots_router, prefix="/reservation", tags=["Reservation"])
 app.include_router(del_reserved_slots_router, prefix="/reservation", tags=["Reservation"])  # <-- اصلاح شد
+app.include_router(spe_template_router, prefix="/reservation", tags=["Reservation"])
+app.include_router(get_free_slots_router, prefix="/reservation", tags=["Reservation"])
+app.include_router(search_available_router, prefix="/reservation", tags=["Reservation"])
+app.include_router(bulk_availability_router, prefix="/reservation", tags=["Reservation"])
+app.include_router(specialist_agenda_router, prefix="/reservation", tags=["Reservation"])
+app.include_router(watch_availability_router, prefix="/reservation", tags=["Reservation"])
+
+# Batch route
+app.include_router(batch_router, tags=["Batch"])
+
+# Metrics route
+app.include_router(metrics_router, tags=["Metrics"])
+
+# آمار کش‌ها، OTP و SMS هم در /metrics
+from auth.dependencies import token_cache
+from auth.send_otp import otp_stats
+from home.catalog import catalog
+from home.search_index import search_index
+from reservation.availability_index import availability_index
+
+metrics.register_stats("token_cache", token_cache.stats)
+metrics.register_stats("revocations", revocations.stats)
+metrics.register_stats("otp", lambda: otp_stats)
+metrics.register_stats("sms", sms_client.stats)
+metrics.register_stats("catalog", catalog.stats)
+metrics.register_stats("search_index", search_index.stats)
+metrics.register_stats("availability_index", availability_index.stats)
+metrics.register_stats("availability_feed", availability_feed.stats)
@@ -0,0 +1,218 @@
+"""
+Request metrics in the Prometheus text format, served on GET /metrics:
+latency histograms, in-flight gauges and status counts per route, plus the
+Mongo commands each route issued (database.connection.CommandStats) and the
+stats() of whatever main.py registers with register_stats().
+Scrapers send the admin key (X-Admin-Key) like the other admin tools.
+"""
+import math
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+from auth.dependencies import require_admin
+from database.connection import RequestDbUsage, mongo, request_db_usage
+
+router = APIRouter()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# paths that match no route share one label, so random URLs cannot grow the series
+UNMATCHED_ROUTE = "unmatched"
+ROUTE_CACHE_SIZE = 1024
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            # per bucket counts, then +Inf, then the sum
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self, name: str, label_names: Tuple[str, ...]) -> List[str]:
+        lines = []
+        for labels, series in sorted(self._series.items()):
+            base = _labels(label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {series[-2]}')
+            lines.append(f"{name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{name}_count{{{base}}} {series[-2]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(value)
+
+
+class RequestMetrics:
+    """Counters updated by MetricsMiddleware; only touched from the event loop."""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(DB_TIME_BUCKETS)
+        self.in_flight: Dict[tuple, int] = defaultdict(int)
+        self.responses: Dict[tuple, int] = defaultdict(int)
+        self.db_commands: Dict[tuple, int] = defaultdict(int)
+        self._stats: List[Tuple[str, Callable[[], dict]]] = []
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict]):
+        """Expose the numeric values of `stats()` as guidora_<prefix>_<key> gauges."""
+        self._stats.append((prefix, stats))
+
+    def observe(self, route: str, method: str, status: int, seconds: float, db: RequestDbUsage):
+        self.latency.observe((route, method), seconds)
+        self.responses[(route, method, status)] += 1
+        self.db_commands[(route, method)] += db.commands
+        self.db_time.observe((route, method), db.seconds)
+
+    def _stats_lines(self) -> List[str]:
+        lines = []
+        for prefix, stats in self._stats:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not (isinstance(value, float) and math.isnan(value)):
+                    name = f"guidora_{prefix}_{key}"
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        route = ("route", "method")
+        lines = [
+            "# HELP guidora_http_request_duration_seconds Request latency by route.",
+            "# TYPE guidora_http_request_duration_seconds histogram",
+            *self.latency.render("guidora_http_request_duration_seconds", route),
+            "# HELP guidora_http_requests_in_flight Requests being served.",
+            "# TYPE guidora_http_requests_in_flight gauge",
+            *(f"guidora_http_requests_in_flight{{{_labels(route, k)}}} {v}" for k, v in sorted(self.in_flight.items())),
+            "# HELP guidora_http_responses_total Responses by route and status.",
+            "# TYPE guidora_http_responses_total counter",
+            *(
+                f"guidora_http_responses_total{{{_labels(route + ('status',), k)}}} {v}"
+                for k, v in sorted(self.responses.items())
+            ),
+            "# HELP guidora_http_request_db_commands_total Mongo commands issued while serving the route.",
+            "# TYPE guidora_http_request_db_commands_total counter",
+            *(
+                f"guidora_http_request_db_commands_total{{{_labels(route, k)}}} {v}"
+                for k, v in sorted(self.db_commands.items())
+            ),
+            "# HELP guidora_http_request_db_seconds Time one request spent in Mongo commands.",
+            "# TYPE guidora_http_request_db_seconds histogram",
+            *self.db_time.render("guidora_http_request_db_seconds", route),
+        ]
+
+        commands = mongo.command_stats.snapshot()
+        for key, kind, help_text in (
+            ("commands", "counter", "Mongo commands by command name."),
+            ("failures", "counter", "Failed Mongo commands by command name."),
+            ("seconds", "counter", "Time spent in Mongo commands by command name."),
+        ):
+            name = f"guidora_mongo_{key}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(
+                f'{name}{{command="{_escape(command)}"}} {counts.get(key, 0)}'
+                for command, counts in sorted(commands.items())
+            )
+
+        pools = mongo.pool_stats.snapshot()
+        for key in ("open", "in_use"):
+            name = f"guidora_mongo_pool_{key}_connections"
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(
+                f'{name}{{server="{_escape(server)}"}} {counts.get(key, 0)}' for server, counts in sorted(pools.items())
+            )
+
+        lines.extend(self._stats_lines())
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (HTTP only; WebSockets pass through). The route label
+    is the route's path template, so path parameters never create new series.
+    Each request gets its own RequestDbUsage in a contextvar; run_db copies the
+    context into the Mongo threads, where CommandStats adds to it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[str, str] = {}
+
+    def _route(self, scope) -> str:
+        path = scope["path"]
+        route = self._routes.get(path)
+        if route is not None:
+            return route
+        route = UNMATCHED_ROUTE
+        for candidate in scope["app"].router.routes:
+            match, _ = candidate.matches(scope)
+            if match != Match.NONE:
+                route = getattr(candidate, "path", path)
+                break
+        if route != UNMATCHED_ROUTE and len(self._routes) < ROUTE_CACHE_SIZE:
+            self._routes[path] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key = (self._route(scope), scope["method"])
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        usage = RequestDbUsage()
+        token = request_db_usage.set(usage)
+        metrics.in_flight[key] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight[key] -= 1
+            request_db_usage.reset(token)
+            metrics.observe(key[0], key[1], status, time.perf_counter() - started, usage)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,18 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional
-from mongoengine import connect, DoesNotExist
-import os
+from mongoengine import ValidationError
 from database.database import Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from profile.upsert import profile_written, upsert_profile, validated_fields
 
 router = APIRouter()  
 
-MONGO_URI = os.environ.get("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is not set!")
-
-connect(host=MONGO_URI)
-
 class SpecialtiesUpdate(BaseModel):
     uid: str
     fname: str
@@ -25,48 +21,31 @@ class SpecialtiesUpdate(BaseModel):
     about: Optional[str] = ""
     tag: Optional[str] = ""  
 
-def verify_token(uid: str, token: str) -> bool:
-    try:
-        user = Specialties.objects.get(uid=uid)
-        return user.token_value == token
-    except DoesNotExist:
-        return False
-
 @router.post("/set_spe_profile") 
-async def update_specialist(data: SpecialtiesUpdate):
-    if not verify_token(data.uid, data.token):
-        raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
-
+async def update_specialist(data: SpecialtiesUpdate, auth: AuthContext = Depends(require_auth)):
     tag_upper = data.tag.upper()
     if tag_upper not in {"LAW", "EDU"}:
         raise HTTPException(status_code=400, detail="Invalid tag value, must be 'law' or 'edu'")
 
     try:
-        specialist = Specialties.objects.get(uid=data.uid)
-        specialist.fname = data.fname
-        specialist.lname = data.lname
-        specialist.age = data.age
-        specialist.gender = data.gender
-        specialist.number = data.number
-        specialist.educert = data.educert
-        specialist.about = data.about
-        specialist.tag = [tag_upper]
-        specialist.save()
-        status = "updated"
-    except DoesNotExist:
-        specialist = Specialties(
-            uid=data.uid,
-            fname=data.fname,
-            lname=data.lname,
-            age=data.age,
-            gender=data.gender,
-            number=data.number,
-            token=data.token,
-            educert=data.educert,
-            about=data.about,
-            tag=[tag_upper]
-        )
-        specialist.save()
-        status = "created"
-
-    return {"status": status}
+        fields = validated_fields(Specialties, data.uid, {
+            "fname": data.fname,
+            "lname": data.lname,
+            "age": data.age,
+            "gender": data.gender,
+            "number": data.number,
+            "educert": data.educert,
+            "about": data.about,
+            "tag": [tag_upper],
+        })
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # توکن فقط هنگام ساخت سند جدید نوشته می‌شود (مثل قبل)
+    profile, created = await run_db(
+        upsert_profile, Specialties, data.uid, fields, {"token": data.token}
+    )
+    status = "created" if created else "updated"
+
+    profile_written(data.uid)
+    return {"status": status, "profile": profile}
@@ -1,18 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from mongoengine import connect, DoesNotExist
+from mongoengine import ValidationError
+import asyncio
 from typing import List # اضافه شد
-import os
 from database.database import User, Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from profile.upsert import profile_written, upsert_profile, validated_fields
 
 router = APIRouter()
 
-MONGO_URI = os.environ.get("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is not set!")
-
-connect(host=MONGO_URI)
-
 class UserUpdate(BaseModel):
     uid: str
     fname: str
@@ -23,56 +20,32 @@ class UserUpdate(BaseModel):
     token: str
     tag: List[str] # تغییر کرد به لیست از رشته ها
 
-def verify_token(uid: str, token: str) -> bool:
-    try:
-        user = User.objects.get(uid=uid)
-        return user.token_value == token
-    except DoesNotExist:
-        return False
-
 @router.post("/set_user_profile")
-async def update_user(data: UserUpdate):
-    if not verify_token(data.uid, data.token):
-        raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
-
-    result = {}
-    
-    # User Model
-    try:
-        u_obj = User.objects.get(uid=data.uid)
-        u_obj.fname = data.fname
-        u_obj.lname = data.lname
-        u_obj.age = data.age
-        u_obj.gender = data.gender
-        u_obj.number = data.number
-        u_obj.save()
-        result["users"] = "updated"
-    except DoesNotExist:
-        u_obj = User(
-            uid=data.uid, fname=data.fname, lname=data.lname,
-            age=data.age, gender=data.gender, number=data.number
-        )
-        u_obj.save()
-        result["users"] = "created"
-
-    # Specialties Model
+async def update_user(data: UserUpdate, auth: AuthContext = Depends(require_auth)):
+    fields = {
+        "fname": data.fname,
+        "lname": data.lname,
+        "age": data.age,
+        "gender": data.gender,
+        "number": data.number,
+    }
+
+    # اعتبارسنجی قبل از هر نوشتن؛ هیچ سندی نیمه‌کاره ذخیره نمی‌شود
     try:
-        s_obj = Specialties.objects.get(uid=data.uid)
-        s_obj.fname = data.fname
-        s_obj.lname = data.lname
-        s_obj.age = data.age
-        s_obj.gender = data.gender
-        s_obj.number = data.number
-        s_obj.tag = data.tag # Pydantic به صورت خودکار لیست را مدیریت می کند
-        s_obj.save()
-        result["specialties"] = "updated"
-    except DoesNotExist:
-        s_obj = Specialties(
-            uid=data.uid, fname=data.fname, lname=data.lname,
-            age=data.age, gender=data.gender, number=data.number,
-            tag=data.tag
-        )
-        s_obj.save()
-        result["specialties"] = "created"
-
-    return {"details": result}
\ No newline at end of file
+        user_fields = validated_fields(User, data.uid, fields)
+        spe_fields = validated_fields(Specialties, data.uid, dict(fields, tag=data.tag))
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # هر مدل یک upsert اتمیک؛ هر دو هم‌زمان
+    (user, user_created), (_, spe_created) = await asyncio.gather(
+        run_db(upsert_profile, User, data.uid, user_fields),
+        run_db(upsert_profile, Specialties, data.uid, spe_fields, return_doc=False),
+    )
+    result = {
+        "users": "created" if user_created else "updated",
+        "specialties": "created" if spe_created else "updated",
+    }
+
+    profile_written(data.uid)
+    return {"details": result, "profile": user}
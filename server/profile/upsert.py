@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from auth.dependencies import token_cache
+from home.catalog import catalog
+from home.search_index import search_index
+from reservation.availability_index import availability_index
+
+PROFILE_FIELDS = ("uid", "fname", "lname", "age", "gender", "number", "tag", "about", "educert")
+
+
+def validated_fields(model, uid: str, fields: dict) -> dict:
+    """
+    Run the model's own validation (clean() + field rules) on an unsaved
+    instance, with no database access, and return `fields` as they would be
+    stored. Raises mongoengine.ValidationError.
+    """
+    doc = model(uid=uid, **fields)
+    doc.validate()
+    stored = doc.to_mongo()
+    return {name: stored[name] for name in fields if name in stored}
+
+
+def insert_defaults(model, uid: str) -> dict:
+    """What save() would store for a fresh document: every field default, as mongo values."""
+    doc = model(uid=uid).to_mongo().to_dict()
+    doc.pop("_id", None)
+    return doc
+
+
+def profile_written(uid: str):
+    """
+    Everything cached from a profile, dropped after any write to it; the
+    role may have just changed from user to specialist.
+    """
+    token_cache.invalidate(uid)
+    catalog.bump()
+    availability_index.mark_dirty(uid)
+    search_index.mark_dirty(uid)
+
+
+def _write(coll, uid: str, update: dict, return_doc: bool) -> Tuple[Optional[dict], bool]:
+    if not return_doc:
+        result = coll.update_one({"uid": uid}, update, upsert=True)
+        return None, result.upserted_id is not None
+    # findAndModify itself (not find_one_and_update) so lastErrorObject tells an insert from an update
+    projection = dict.fromkeys(PROFILE_FIELDS, 1)
+    projection["_id"] = 0
+    reply = coll.database.command(
+        "findAndModify", coll.name,
+        query={"uid": uid}, update=update, fields=projection, upsert=True, new=True,
+    )
+    return reply["value"], not reply["lastErrorObject"]["updatedExisting"]
+
+
+def upsert_profile(
+    model, uid: str, fields: dict, on_insert: Optional[dict] = None, return_doc: bool = True
+) -> Tuple[Optional[dict], bool]:
+    """
+    One atomic upsert in place of get + save, returning the post-image from
+    the same round trip; a new document gets the model's defaults through
+    $setOnInsert, so it has the shape save() gives.
+    `fields` must already be validated. Returns (post-image or None, created).
+    """
+    now = datetime.utcnow()
+    set_fields = dict(fields, updated_at=now)
+    insert = insert_defaults(model, uid)
+    insert.update(on_insert or {})
+    insert["created_at"] = now
+    for name in set_fields:
+        # one path cannot be in both $set and $setOnInsert
+        insert.pop(name, None)
+    update = {"$set": set_fields, "$setOnInsert": insert}
+
+    coll = model._get_collection()
+    try:
+        return _write(coll, uid, update, return_doc)
+    except DuplicateKeyError:
+        # two upserts of a new uid raced; the loser's retry is a plain update
+        return _write(coll, uid, update, return_doc)
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from database.aio import run_db
+
+log = logging.getLogger(__name__)
+
+
+class RefreshingIndex:
+    """
+    Freshness model shared by the in-memory specialist indexes: local writes
+    mark a uid dirty and it is re-read before the next lookup; a full rebuild
+    every `max_age` seconds picks up writes made by other workers.
+
+    Subclasses implement fetch() (blocking, runs in the Mongo pool), _reset(),
+    _put(row) and _remove(uid).
+    """
+
+    name = "index"
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._dirty: set = set()
+        self._built_at: Optional[float] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        # uids re-read while a rebuild was in flight; its older full scan overwrites them
+        self._refreshed_during_rebuild: set = set()
+
+    def fetch(self, uids: Optional[List[str]] = None) -> list:
+        raise NotImplementedError
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _put(self, row: dict):
+        raise NotImplementedError
+
+    def _remove(self, uid: str):
+        raise NotImplementedError
+
+    def mark_dirty(self, uid: str):
+        self._dirty.add(uid)
+
+    @property
+    def _rebuilding(self) -> bool:
+        return self._rebuild_task is not None and not self._rebuild_task.done()
+
+    async def _rebuild(self):
+        dirty_before = set(self._dirty)
+        self._refreshed_during_rebuild = set()
+        rows = await run_db(self.fetch)
+        self._reset()
+        for row in rows:
+            self._put(row)
+        self._dirty -= dirty_before
+        # re-read them on the next lookup rather than serve the scan's older rows
+        self._dirty |= self._refreshed_during_rebuild
+        self._refreshed_during_rebuild = set()
+        self._built_at = time.monotonic()
+
+    def _start_rebuild(self) -> asyncio.Task:
+        if not self._rebuilding:
+            self._rebuild_task = asyncio.create_task(self._rebuild())
+            self._rebuild_task.add_done_callback(self._rebuild_done)
+        return self._rebuild_task
+
+    def _rebuild_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error("%s rebuild failed: %s", self.name, task.exception())
+
+    async def ensure_fresh(self):
+        if self._built_at is None:
+            await asyncio.shield(self._start_rebuild())
+        elif time.monotonic() - self._built_at > self.max_age:
+            self._start_rebuild()
+
+        if self._dirty:
+            uids = list(self._dirty)
+            self._dirty.clear()
+            rows = await run_db(self.fetch, uids)
+            found = set()
+            for row in rows:
+                found.add(row["uid"])
+                self._put(row)
+            for uid in set(uids) - found:
+                self._remove(uid)
+            if self._rebuilding:
+                self._refreshed_during_rebuild.update(uids)
+
+    def age(self) -> Optional[float]:
+        return None if self._built_at is None else time.monotonic() - self._built_at
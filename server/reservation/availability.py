@@ -0,0 +1,81 @@
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from database.database import Specialties
+from reservation.slots import availability_changes, exception_guard, exception_update
+
+AVAILABILITY_FIELDS = {"_id": 0, "uid": 1, "availability": 1, "weekly_template": 1}
+# a diff is based on one read; retry when another write changed the same days meanwhile
+MAX_ATTEMPTS = 3
+
+
+def _changes_for(doc: dict, day_masks: Dict[str, int], mode: str, days_off: Iterable[str]) -> dict:
+    return availability_changes(
+        doc.get("availability") or {},
+        doc.get("weekly_template") or {},
+        day_masks,
+        mode,
+        days_off,
+    )
+
+
+def update_availability(
+    uid: str, day_masks: Dict[str, int], mode: str, days_off: Iterable[str] = ()
+) -> Optional[dict]:
+    """
+    Write only the date exceptions that change, in one update_one guarded on
+    their previous values. `booked` is never touched.
+    Returns {"changed": n, "conflict": bool}, or None if the specialist does not exist.
+    """
+    days_off = list(days_off)
+    coll = Specialties._get_collection()
+    for _ in range(MAX_ATTEMPTS):
+        doc = coll.find_one({"uid": uid}, projection=AVAILABILITY_FIELDS)
+        if doc is None:
+            return None
+        changes = _changes_for(doc, day_masks, mode, days_off)
+        if not changes:
+            return {"changed": 0, "conflict": False}
+
+        query = {"uid": uid}
+        query.update(exception_guard(doc.get("availability"), changes))
+        if coll.update_one(query, exception_update(changes)).matched_count:
+            return {"changed": len(changes), "conflict": False}
+    return {"changed": 0, "conflict": True}
+
+
+def bulk_update_availability(items: List[dict]) -> dict:
+    """
+    items: [{"uid", "day_masks", "mode", "days_off"}]. One find for all the
+    specialists, then every guarded update in a single unordered bulk_write.
+    """
+    coll = Specialties._get_collection()
+    uids = [item["uid"] for item in items]
+    docs = {
+        doc["uid"]: doc
+        for doc in coll.find({"uid": {"$in": uids}}, projection=AVAILABILITY_FIELDS)
+    }
+
+    ops, missing, unchanged = [], [], 0
+    for item in items:
+        doc = docs.get(item["uid"])
+        if doc is None:
+            missing.append(item["uid"])
+            continue
+        changes = _changes_for(doc, item["day_masks"], item["mode"], item.get("days_off", ()))
+        if not changes:
+            unchanged += 1
+            continue
+        query = {"uid": item["uid"]}
+        query.update(exception_guard(doc.get("availability"), changes))
+        ops.append(UpdateOne(query, exception_update(changes)))
+
+    matched = coll.bulk_write(ops, ordered=False).matched_count if ops else 0
+    return {
+        "updated": matched,
+        "unchanged": unchanged,
+        # guard did not match: changed by someone else since the read, safe to resubmit
+        "conflicts": len(ops) - matched,
+        "missing": missing,
+    }
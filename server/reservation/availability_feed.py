@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from database.database import Specialties
+from database.aio import run_db
+from reservation.slots import DAY_FORMAT, free_masks, mask_to_intervals
+
+log = logging.getLogger(__name__)
+
+try:
+    AVAILABILITY_FEED_POLL_INTERVAL = float(os.environ.get("AVAILABILITY_FEED_POLL_INTERVAL", "5"))
+except ValueError:
+    AVAILABILITY_FEED_POLL_INTERVAL = 5.0
+
+try:
+    AVAILABILITY_FEED_QUEUE_SIZE = int(os.environ.get("AVAILABILITY_FEED_QUEUE_SIZE", "16"))
+except ValueError:
+    AVAILABILITY_FEED_QUEUE_SIZE = 16
+
+try:
+    AVAILABILITY_FEED_HORIZON_DAYS = int(os.environ.get("AVAILABILITY_FEED_HORIZON_DAYS", "30"))
+except ValueError:
+    AVAILABILITY_FEED_HORIZON_DAYS = 30
+
+FEED_FIELDS = {"_id": 0, "uid": 1, "availability": 1, "weekly_template": 1, "booked": 1}
+# uids per $in query when refreshing every watched specialist
+FEED_FETCH_BATCH = 500
+
+
+def fetch_free(uids: List[str], horizon_days: int) -> Dict[str, Dict[str, int]]:
+    """uid -> {day: free mask} from today to the horizon; missing specialists are left out."""
+    start = datetime.utcnow().date()
+    end = start + timedelta(days=horizon_days)
+    free = {}
+    for row in Specialties._get_collection().find({"uid": {"$in": uids}}, projection=FEED_FIELDS):
+        free[row["uid"]] = free_masks(
+            row.get("availability") or {},
+            row.get("booked") or {},
+            row.get("weekly_template") or {},
+            start,
+            end,
+        )
+    return free
+
+
+def day_intervals(masks: Dict[str, int], days) -> Dict[str, List[Dict]]:
+    """{day: [{"start", "end"}]}; a day with nothing free maps to []."""
+    return {
+        day: [{"start": start, "end": end} for start, end in mask_to_intervals(masks.get(day, 0))]
+        for day in sorted(days)
+    }
+
+
+class Subscription:
+    """
+    One watcher of one specialist. Messages wait in a bounded queue; a client
+    too slow to drain it loses the queued diffs and gets a fresh snapshot instead.
+    """
+
+    def __init__(self, feed: "AvailabilityFeed", specialist_uid: str, queue_size: int):
+        self.feed = feed
+        self.specialist_uid = specialist_uid
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, message: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.feed.overflows += 1
+            self.queue.put_nowait(self.feed.snapshot(self.specialist_uid))
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class AvailabilityFeed:
+    """
+    In-process fan-out of free-slot changes to watchers of a specialist.
+    The last free masks of every watched specialist are kept here; write paths
+    on this worker call notify() and the change is re-read once and pushed as a
+    per-day diff to all its watchers. Every AVAILABILITY_FEED_POLL_INTERVAL
+    seconds all watched specialists are re-read in batches, which picks up
+    other workers' writes and the day rolling over.
+    """
+
+    def __init__(self, poll_interval: float, queue_size: int, horizon_days: int):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.horizon_days = horizon_days
+        self._subs: Dict[str, Set[Subscription]] = {}
+        self._free: Dict[str, Dict[str, int]] = {}
+        self._pending: Set[str] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self.diffs = 0
+        self.overflows = 0
+
+    def snapshot(self, specialist_uid: str) -> dict:
+        masks = self._free.get(specialist_uid, {})
+        return {"type": "snapshot", "specialist_uid": specialist_uid, "days": day_intervals(masks, masks)}
+
+    async def subscribe(self, specialist_uid: str) -> Optional[Subscription]:
+        """None if the specialist does not exist. The snapshot is the first queued message."""
+        if specialist_uid not in self._free:
+            free = await run_db(fetch_free, [specialist_uid], self.horizon_days)
+            if specialist_uid not in free:
+                return None
+            self._free.setdefault(specialist_uid, free[specialist_uid])
+        sub = Subscription(self, specialist_uid, self.queue_size)
+        self._subs.setdefault(specialist_uid, set()).add(sub)
+        self.subscribers += 1
+        sub.push(self.snapshot(specialist_uid))
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subs.get(sub.specialist_uid)
+        if subs is None or sub not in subs:
+            return
+        subs.discard(sub)
+        self.subscribers -= 1
+        if not subs:
+            del self._subs[sub.specialist_uid]
+            self._free.pop(sub.specialist_uid, None)
+
+    def notify(self, specialist_uid: str):
+        """Availability of `specialist_uid` changed on this worker; free when nobody watches."""
+        if specialist_uid in self._subs:
+            self._pending.add(specialist_uid)
+            if self._wake is not None:
+                self._wake.set()
+
+    def _apply(self, specialist_uid: str, masks: Dict[str, int]):
+        subs = self._subs.get(specialist_uid)
+        if not subs:
+            return
+        old = self._free.get(specialist_uid, {})
+        self._free[specialist_uid] = masks
+        # days that fell off the front of the window are dropped without a message
+        first_day = datetime.utcnow().strftime(DAY_FORMAT)
+        changed = [
+            day for day in set(old) | set(masks)
+            if day >= first_day and old.get(day, 0) != masks.get(day, 0)
+        ]
+        if not changed:
+            return
+        message = {"type": "diff", "specialist_uid": specialist_uid, "days": day_intervals(masks, changed)}
+        self.diffs += 1
+        for sub in list(subs):
+            sub.push(message)
+
+    async def refresh(self, uids: List[str]):
+        for i in range(0, len(uids), FEED_FETCH_BATCH):
+            batch = uids[i:i + FEED_FETCH_BATCH]
+            free = await run_db(fetch_free, batch, self.horizon_days)
+            for uid in batch:
+                # a specialist that disappeared reads as having nothing free
+                self._apply(uid, free.get(uid, {}))
+
+    async def _run(self):
+        polled_at = time.monotonic()
+        while True:
+            timeout = max(0.0, polled_at + self.poll_interval - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            if time.monotonic() - polled_at >= self.poll_interval:
+                # on schedule even while notifications keep waking the loop
+                uids = list(self._subs)
+                polled_at = time.monotonic()
+            else:
+                uids = list(self._pending)
+            self._wake.clear()
+            self._pending.clear()
+            try:
+                await self.refresh(uids)
+            except Exception:
+                log.exception("Availability feed refresh failed")
+
+    async def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "specialists": len(self._subs),
+            "subscribers": self.subscribers,
+            "diffs": self.diffs,
+            "overflows": self.overflows,
+        }
+
+
+availability_feed = AvailabilityFeed(
+    AVAILABILITY_FEED_POLL_INTERVAL, AVAILABILITY_FEED_QUEUE_SIZE, AVAILABILITY_FEED_HORIZON_DAYS
+)
@@ -0,0 +1,134 @@
+import heapq
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from database.database import Specialties
+from refreshing_index import RefreshingIndex
+from reservation.slots import SLOTS_PER_DAY, weekday_key
+
+log = logging.getLogger(__name__)
+
+try:
+    AVAILABILITY_INDEX_MAX_AGE = float(os.environ.get("AVAILABILITY_INDEX_MAX_AGE", "60"))
+except ValueError:
+    AVAILABILITY_INDEX_MAX_AGE = 60.0
+
+INDEX_FIELDS = ("uid", "fname", "lname", "tag", "availability", "weekly_template", "booked")
+
+
+@dataclass
+class SpecialistAvailability:
+    uid: str
+    fname: str
+    lname: str
+    tags: List[str]
+    availability: Dict[str, int] = field(default_factory=dict)
+    template: Dict[str, int] = field(default_factory=dict)
+    booked: Dict[str, int] = field(default_factory=dict)
+
+    def free_mask(self, day: str, weekday: str) -> int:
+        base = self.availability.get(day)
+        if base is None:
+            base = self.template.get(weekday, 0)
+        return base & ~self.booked.get(day, 0)
+
+
+def first_run_start(mask: int, length: int) -> int:
+    """Bit where the first run of at least `length` set bits begins, or -1."""
+    if length > SLOTS_PER_DAY:
+        return -1
+    starts = mask
+    for _ in range(length - 1):
+        starts &= starts >> 1
+    return (starts & -starts).bit_length() - 1
+
+
+def run_end(mask: int, start: int) -> int:
+    end = start
+    while (mask >> end) & 1:
+        end += 1
+    return end
+
+
+def fetch_rows(uids: Optional[List[str]] = None) -> list:
+    query = {"uid__in": uids} if uids is not None else {}
+    return list(Specialties.objects(**query).only(*INDEX_FIELDS).as_pymongo())
+
+
+class AvailabilityIndex(RefreshingIndex):
+    """
+    Per-tag in-memory copy of every specialist's availability bitmaps, kept
+    fresh as described in RefreshingIndex (full rebuild every
+    AVAILABILITY_INDEX_MAX_AGE seconds). Results are advisory: booking itself
+    stays atomic in Mongo.
+    """
+
+    name = "Availability index"
+
+    def __init__(self, max_age: float):
+        super().__init__(max_age)
+        self._by_tag: Dict[str, Dict[str, SpecialistAvailability]] = {}
+        self._entries: Dict[str, SpecialistAvailability] = {}
+
+    def fetch(self, uids: Optional[List[str]] = None) -> list:
+        return fetch_rows(uids)
+
+    def _reset(self):
+        self._by_tag, self._entries = {}, {}
+
+    def _remove(self, uid: str):
+        old = self._entries.pop(uid, None)
+        if old:
+            for tag in old.tags:
+                self._by_tag.get(tag, {}).pop(uid, None)
+
+    def _put(self, row: dict):
+        entry = SpecialistAvailability(
+            uid=row["uid"],
+            fname=row.get("fname", ""),
+            lname=row.get("lname", ""),
+            tags=[t.lower() for t in row.get("tag", [])],
+            availability=row.get("availability") or {},
+            template=row.get("weekly_template") or {},
+            booked=row.get("booked") or {},
+        )
+        self._remove(entry.uid)
+        self._entries[entry.uid] = entry
+        for tag in entry.tags:
+            self._by_tag.setdefault(tag, {})[entry.uid] = entry
+
+    def search(self, tag: str, days: List[str], window: int, slots: int, limit: int) -> list:
+        """
+        Specialists with `tag` having `slots` contiguous free chunks inside `window`
+        on one of `days`; each with its earliest such run, earliest first.
+        """
+        day_keys = [(day, weekday_key(day)) for day in days]
+        matches = []
+        for entry in self._by_tag.get(tag.lower(), {}).values():
+            for day_pos, (day, weekday) in enumerate(day_keys):
+                free = entry.free_mask(day, weekday) & window
+                if not free:
+                    continue
+                start = first_run_start(free, slots)
+                if start >= 0:
+                    matches.append((day_pos, start, entry.uid, entry, day, free))
+                    break
+
+        best = heapq.nsmallest(limit, matches, key=lambda m: m[:3])
+        return [
+            (entry, day, (start, run_end(free, start)))
+            for _, start, _, entry, day, free in best
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "specialists": len(self._entries),
+            "tags": {tag: len(v) for tag, v in self._by_tag.items()},
+            "dirty": len(self._dirty),
+            "age": self.age(),
+        }
+
+
+availability_index = AvailabilityIndex(AVAILABILITY_INDEX_MAX_AGE)
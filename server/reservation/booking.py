@@ -0,0 +1,157 @@
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from bson.int64 import Int64
+from pymongo import ReturnDocument
+
+from database.database import Appointment, Specialties, User
+from reservation.slots import (
+    book_update,
+    claim_filter,
+    mask_runs,
+    release_update,
+    run_mask,
+    slot_datetime,
+)
+from reservation.schedule import pull_schedule, push_schedule
+
+log = logging.getLogger("reservation.booking")
+
+SPECIALIST_BOOKING_FIELDS = {"uid": 1, "fname": 1, "lname": 1, "number": 1}
+
+
+def claim_slots(fname: str, lname: str, day_masks: Dict[str, int]) -> Optional[dict]:
+    """
+    Atomically set the requested bits in the specialist's `booked` map,
+    but only if every one of them is available and not already booked.
+    Returns the specialist (booking fields only) or None if the claim lost.
+    """
+    query = {"fname": fname, "lname": lname}
+    query.update(claim_filter(day_masks))
+    return Specialties._get_collection().find_one_and_update(
+        query,
+        book_update(day_masks),
+        projection=SPECIALIST_BOOKING_FIELDS,
+        return_document=ReturnDocument.BEFORE,
+    )
+
+
+def release_slots(specialist_uid: str, day_masks: Dict[str, int]):
+    Specialties._get_collection().update_one({"uid": specialist_uid}, release_update(day_masks))
+
+
+def specialist_exists(fname: str, lname: str) -> bool:
+    return Specialties.objects(fname=fname, lname=lname).only("uid").first() is not None
+
+
+def appointment_docs(booking_id: str, user_uid: str, specialist: dict, day_masks: Dict[str, int]) -> List[dict]:
+    """One document per contiguous interval, in chronological order."""
+    docs = []
+    for day in sorted(day_masks):
+        for first, end in mask_runs(day_masks[day]):
+            docs.append({
+                "booking_id": booking_id,
+                "user_uid": user_uid,
+                "specialist_uid": specialist["uid"],
+                "specialist_fname": specialist.get("fname"),
+                "specialist_lname": specialist.get("lname"),
+                "specialist_number": specialist.get("number"),
+                "day": day,
+                "mask": Int64(run_mask(first, end)),
+                "start": slot_datetime(day, first),
+                "end": slot_datetime(day, end),
+                "created_at": datetime.utcnow(),
+            })
+    return docs
+
+
+def book_slots(user_uid: str, fname: str, lname: str, day_masks: Dict[str, int]) -> dict:
+    """
+    Claim the slots on the specialist, then record them as appointments.
+    If the appointments do not land, the claimed slots are given back.
+    Returns {"status": "ok" | "taken" | "no_specialist" | "no_user", ...}.
+    """
+    if User.objects(uid=user_uid).only("uid").first() is None:
+        return {"status": "no_user"}
+
+    specialist = claim_slots(fname, lname, day_masks)
+    if specialist is None:
+        if not specialist_exists(fname, lname):
+            return {"status": "no_specialist"}
+        return {"status": "taken"}
+
+    booking_id = uuid.uuid4().hex
+    docs = appointment_docs(booking_id, user_uid, specialist, day_masks)
+    coll = Appointment._get_collection()
+    try:
+        coll.insert_many(docs)
+    except Exception:
+        coll.delete_many({"booking_id": booking_id})
+        release_slots(specialist["uid"], day_masks)
+        raise
+
+    try:
+        push_schedule(user_uid, docs)
+    except Exception:
+        # the booking stands; verify_schedule(repair=True) rebuilds the view
+        log.exception("Failed to update the schedule view of %s", user_uid)
+
+    return {"status": "ok", "specialist": specialist, "booking_id": booking_id, "appointments": docs}
+
+
+def _object_id(appointment_id: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(appointment_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+def cancel_appointment(user_uid: str, appointment_id: str) -> Optional[dict]:
+    """
+    Delete one of the user's appointments and give its bits back to the specialist.
+    find_one_and_delete makes sure concurrent cancels release the slots only once.
+    Returns the deleted appointment, or None if the user has no such appointment.
+    """
+    oid = _object_id(appointment_id)
+    if oid is None:
+        return None
+    doc = Appointment._get_collection().find_one_and_delete({"_id": oid, "user_uid": user_uid})
+    if doc is None:
+        return None
+    try:
+        release_slots(doc["specialist_uid"], {doc["day"]: doc["mask"]})
+    except Exception:
+        # the appointment is gone but its bits stay booked: never double-booked, only lost
+        log.exception("Failed to release %s %s on %s", doc["specialist_uid"], doc["day"], hex(doc["mask"]))
+        raise
+    try:
+        pull_schedule(user_uid, [doc])
+    except Exception:
+        log.exception("Failed to update the schedule view of %s", user_uid)
+    return doc
+
+
+def upcoming_appointments(user_uid: str, since: datetime, limit: int, specialist: Optional[dict] = None) -> List[dict]:
+    """The user's appointments starting at or after `since`, earliest first ((user_uid, start) index)."""
+    query = {"user_uid": user_uid, "start": {"$gte": since}}
+    if specialist:
+        query.update(specialist)
+    return list(Appointment._get_collection().find(query).sort("start", 1).limit(limit))
+
+
+def specialist_appointments(
+    specialist_uid: str, since: datetime, until: datetime, limit: int, after: Optional[datetime] = None
+) -> List[dict]:
+    """
+    Appointments with since <= start < until, earliest first ((specialist_uid, start) index).
+    `after` is a keyset cursor: a specialist's appointments never share a start time.
+    """
+    start = {"$gte": since, "$lt": until}
+    if after is not None and after >= since:
+        start = {"$gt": after, "$lt": until}
+    query = {"specialist_uid": specialist_uid, "start": start}
+    return list(Appointment._get_collection().find(query).sort("start", 1).limit(limit))
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import List, Literal
+import os
+from database.aio import run_db
+from auth.dependencies import require_admin
+from reservation.slots import intervals_to_day_masks, parse_day
+from reservation.availability import bulk_update_availability
+from reservation.availability_index import availability_index
+from reservation.availability_feed import availability_feed
+from reservation.set_spe_avi_slots import SlotItem
+
+router = APIRouter()
+
+try:
+    BULK_AVAILABILITY_MAX_ITEMS = int(os.environ.get("BULK_AVAILABILITY_MAX_ITEMS", "1000"))
+except ValueError:
+    BULK_AVAILABILITY_MAX_ITEMS = 1000
+
+class SpecialistAvailabilityItem(BaseModel):
+    uid: str
+    slots: List[SlotItem] = []
+    days_off: List[str] = []
+    mode: Literal["replace", "add", "remove"] = "replace"
+
+class BulkAvailabilityRequest(BaseModel):
+    items: List[SpecialistAvailabilityItem]
+
+# ابزار ادمین: به‌روزرسانی دسترسی چند متخصص با یک bulk_write
+@router.post("/admin/bulk_set_availability", dependencies=[Depends(require_admin)])
+async def bulk_set_availability(data: BulkAvailabilityRequest):
+    if not data.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(data.items) > BULK_AVAILABILITY_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_AVAILABILITY_MAX_ITEMS} items per request")
+
+    items = []
+    for item in data.items:
+        try:
+            day_masks = intervals_to_day_masks((s.day, s.start, s.end) for s in item.slots)
+            days_off = [parse_day(day) for day in item.days_off]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{item.uid}: {e}")
+        items.append({"uid": item.uid, "day_masks": day_masks, "mode": item.mode, "days_off": days_off})
+
+    try:
+        result = await run_db(bulk_update_availability, items)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    for item in items:
+        availability_index.mark_dirty(item["uid"])
+        availability_feed.notify(item["uid"])
+    return {"status": "success", **result}
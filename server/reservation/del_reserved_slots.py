@@ -1,64 +1,67 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from datetime import datetime, timedelta, timezone
-import os
-import jwt
-from mongoengine import connect
-from database.database import Specialties, User
+from typing import Optional
+from datetime import datetime
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.booking import cancel_appointment, upcoming_appointments
+from reservation.availability_index import availability_index
+from reservation.availability_feed import availability_feed
 
 router = APIRouter()
 
-MONGO_URI = os.environ.get("MONGO_URI")
-JWT_SECRET = os.environ.get("GUIDORA_JWT_SECRET")
-
-if not MONGO_URI or not JWT_SECRET:
-    raise RuntimeError("Environment variables are not set!")
-
-connect(host=MONGO_URI)
+# سقف رزروهایی که در حالت قدیمی (بر اساس نام متخصص) با یک درخواست لغو می‌شوند
+LEGACY_CANCEL_LIMIT = 200
 
 
 class CancelReservationRequest(BaseModel):
     uid: str
     token: str
-    fname: str
-    lname: str
-
-
-def verify_jwt_and_uid(token: str, request_uid: str):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        token_uid = payload.get("uid")
-        if not token_uid or token_uid != request_uid:
-            raise HTTPException(status_code=401, detail="Token UID mismatch")
-        return payload
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    # لغو یک رزرو مشخص
+    appointment_id: Optional[str] = None
+    # حالت قدیمی: لغو همه‌ی رزروهای پیش‌رو با این متخصص
+    fname: Optional[str] = None
+    lname: Optional[str] = None
 
 
 @router.post("/del_reserved_slots")
-async def del_reserved_slots(data: CancelReservationRequest):
-    verify_jwt_and_uid(data.token, data.uid)
+async def del_reserved_slots(data: CancelReservationRequest, auth: AuthContext = Depends(require_auth)):
 
-    user = User.objects(uid=data.uid).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if not user.appointments or len(user.appointments) == 0:
-        raise HTTPException(status_code=400, detail="No reservations to cancel")
-
-    if (getattr(user, "reserved_specialist_fname", "").lower() != data.fname.lower() or
-        getattr(user, "reserved_specialist_lname", "").lower() != data.lname.lower()):
-        raise HTTPException(status_code=400, detail="This reservation is not with the specified specialist")
+    if data.appointment_id:
+        ids = [data.appointment_id]
+    elif data.fname and data.lname:
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        docs = await run_db(
+            upcoming_appointments,
+            auth.uid,
+            today,
+            LEGACY_CANCEL_LIMIT,
+            {"specialist_fname": data.fname.lower(), "specialist_lname": data.lname.lower()},
+        )
+        if not docs:
+            raise HTTPException(status_code=400, detail="No reservations to cancel")
+        ids = [str(doc["_id"]) for doc in docs]
+    else:
+        raise HTTPException(status_code=400, detail="appointment_id (or fname and lname) is required")
 
+    cancelled = []
     try:
-        user.update(
-            unset__appointments=1,
-            unset__last_specialist_uid=1,
-            unset__reserved_specialist_fname=1,
-            unset__reserved_specialist_lname=1,
-            unset__reserved_specialist_number=1
-        )
+        for appointment_id in ids:
+            doc = await run_db(cancel_appointment, auth.uid, appointment_id)
+            if doc:
+                cancelled.append(doc)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to cancel reservation")
+    finally:
+        for uid in {doc["specialist_uid"] for doc in cancelled}:
+            availability_index.mark_dirty(uid)
+            availability_feed.notify(uid)
+
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="Reservation not found")
 
-    return {"status": "success", "message": "Reservation cancelled successfully"}
+    return {
+        "status": "success",
+        "message": "Reservation cancelled successfully",
+        "cancelled": [str(doc["_id"]) for doc in cancelled],
+    }
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from datetime import datetime, timedelta
+import os
+from database.database import Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.slots import DAY_FORMAT, free_masks, mask_to_intervals
+
+router = APIRouter()
+
+try:
+    MAX_RANGE_DAYS = int(os.environ.get("FREE_SLOTS_MAX_RANGE_DAYS", "62"))
+except ValueError:
+    MAX_RANGE_DAYS = 62
+
+AVAILABILITY_FIELDS = ("uid", "availability", "weekly_template", "booked")
+
+class FreeSlotsRequest(BaseModel):
+    uid: str
+    token: str
+    specialist_uid: str
+    from_day: str = Field(..., description="YYYY-MM-DD")
+    to_day: str = Field(..., description="YYYY-MM-DD")
+
+def load_availability(specialist_uid: str):
+    return Specialties.objects(uid=specialist_uid).only(*AVAILABILITY_FIELDS).as_pymongo().first()
+
+@router.post("/get_free_slots")
+async def get_free_slots(data: FreeSlotsRequest, auth: AuthContext = Depends(require_auth)):
+    try:
+        start = datetime.strptime(data.from_day, DAY_FORMAT).date()
+        end = datetime.strptime(data.to_day, DAY_FORMAT).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    if end < start or end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range must be 1 to {MAX_RANGE_DAYS} days")
+
+    doc = await run_db(load_availability, data.specialist_uid)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Specialist not found")
+
+    # برنامه‌ی هفتگی + استثناها - رزروها، فقط برای بازه‌ی درخواستی
+    free = free_masks(
+        doc.get("availability"), doc.get("booked"), doc.get("weekly_template"), start, end
+    )
+    return {
+        "specialist_uid": data.specialist_uid,
+        "slots": {
+            day: [{"start": s, "end": e} for s, e in mask_to_intervals(mask)]
+            for day, mask in free.items()
+        }
+    }
@@ -1,110 +1,53 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
-from typing import List, Dict
-from datetime import datetime, timedelta
+from typing import Optional
+from datetime import datetime
 import os
-import jwt
-from database.database import User
-from mongoengine import connect
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.schedule import load_schedule
+from encoding import negotiated_response
 
 router = APIRouter()
 
-MONGO_URI = os.environ.get("MONGO_URI")
-JWT_SECRET = os.environ.get("GUIDORA_JWT_SECRET")
+try:
+    APPOINTMENTS_PAGE_SIZE = int(os.environ.get("APPOINTMENTS_PAGE_SIZE", "50"))
+except ValueError:
+    APPOINTMENTS_PAGE_SIZE = 50
 
-if not MONGO_URI or not JWT_SECRET:
-    raise RuntimeError("Environment variables are not set!")
-
-connect(host=MONGO_URI)
+try:
+    APPOINTMENTS_MAX_PAGE_SIZE = int(os.environ.get("APPOINTMENTS_MAX_PAGE_SIZE", "200"))
+except ValueError:
+    APPOINTMENTS_MAX_PAGE_SIZE = 200
 
 
 class AuthRequest(BaseModel):
     uid: str
     token: str
-
-
-def verify_jwt_and_uid(token: str, request_uid: str):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        token_uid = payload.get("uid")
-        if not token_uid or token_uid != request_uid:
-            raise HTTPException(status_code=401, detail="Token UID mismatch")
-        return payload
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-
-def consolidate_slots(iso_slots: List[str]) -> List[Dict]:
-    if not iso_slots:
-        return []
-
-    dts = sorted([
-        datetime.fromisoformat(s.replace('Z', '+00:00'))
-        for s in iso_slots
-    ])
-
-    merged = []
-    start_time = dts[0]
-    current_time = dts[0]
-
-    for i in range(1, len(dts)):
-        if dts[i] == current_time + timedelta(minutes=30):
-            current_time = dts[i]
-        else:
-            merged.append({
-                "day": start_time.strftime("%Y-%m-%d"),
-                "start": start_time.strftime("%H:%M"),
-                "end": (current_time + timedelta(minutes=30)).strftime("%H:%M")
-            })
-            start_time = dts[i]
-            current_time = dts[i]
-
-    merged.append({
-        "day": start_time.strftime("%Y-%m-%d"),
-        "start": start_time.strftime("%H:%M"),
-        "end": (current_time + timedelta(minutes=30)).strftime("%H:%M")
-    })
-
-    return merged
+    limit: Optional[int] = None
 
 
 @router.post("/get_reserved_slots")
-async def get_user_appointments(data: AuthRequest):
-    verify_jwt_and_uid(data.token, data.uid)
-
-    user = User.objects(uid=data.uid).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    raw_slots = user.appointments or []
+async def get_user_appointments(data: AuthRequest, request: Request, auth: AuthContext = Depends(require_auth)):
+    limit = max(1, min(data.limit or APPOINTMENTS_PAGE_SIZE, APPOINTMENTS_MAX_PAGE_SIZE))
+    today = datetime.utcnow().strftime("%Y-%m-%d")
 
-    spe_fname = getattr(user, "reserved_specialist_fname", None)
-    spe_lname = getattr(user, "reserved_specialist_lname", None)
-    spe_number = getattr(user, "reserved_specialist_number", None)
-
-    if not raw_slots:
-        return {
-            "fname": spe_fname,
-            "lname": spe_lname,
-            "number": spe_number,
-            "slots": {}
-        }
-
-    formatted_slots = consolidate_slots(raw_slots)
+    # برنامه‌ی آماده روی سند کاربر (reservation/schedule.py): یک خواندن، بدون پردازش
+    schedule = await run_db(load_schedule, auth.uid, today)
 
     final_output = {}
-    for item in formatted_slots:
-        day = item["day"]
-        if day not in final_output:
-            final_output[day] = []
-        final_output[day].append({
-            "start": item["start"],
-            "end": item["end"]
-        })
-
-    return {
-        "fname": spe_fname,
-        "lname": spe_lname,
-        "number": spe_number,
+    remaining = limit
+    for day, entries in schedule.items():
+        if remaining <= 0:
+            break
+        final_output[day] = entries[:remaining]
+        remaining -= len(final_output[day])
+
+    # سازگاری با کلاینت‌های قدیمی: متخصص نزدیک‌ترین رزرو
+    first = next(iter(final_output.values()), [{}])[0]
+    return negotiated_response(request, {
+        "fname": first.get("fname"),
+        "lname": first.get("lname"),
+        "number": first.get("number"),
         "slots": final_output
-    }
+    })
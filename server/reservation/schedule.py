@@ -0,0 +1,107 @@
+"""
+User.schedule: a ready-to-serve day -> [appointment entry] view of the user's
+appointments, kept in step by set_user_slot / del_reserved_slots so the read
+path is one projected fetch. `schedule_rev` counts its writes; a rebuild only
+lands if no incremental update happened since it read the appointments.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from database.database import Appointment, User
+from reservation.slots import mask_to_intervals
+
+log = logging.getLogger("reservation.schedule")
+
+
+def schedule_entry(doc: dict) -> Dict:
+    start, end = mask_to_intervals(doc["mask"])[0]
+    return {
+        "appointment_id": str(doc["_id"]),
+        "start": start,
+        "end": end,
+        "specialist_uid": doc["specialist_uid"],
+        "fname": doc.get("specialist_fname"),
+        "lname": doc.get("specialist_lname"),
+        "number": doc.get("specialist_number"),
+    }
+
+
+def build_schedule(docs: List[dict]) -> Dict[str, List[Dict]]:
+    schedule: Dict[str, List[Dict]] = {}
+    for doc in sorted(docs, key=lambda d: d["start"]):
+        schedule.setdefault(doc["day"], []).append(schedule_entry(doc))
+    return schedule
+
+
+def push_schedule(user_uid: str, docs: List[dict]):
+    """Add freshly booked appointments to the view, keeping each day sorted by start."""
+    pushes = {
+        f"schedule.{day}": {"$each": entries, "$sort": {"start": 1}}
+        for day, entries in build_schedule(docs).items()
+    }
+    User._get_collection().update_one(
+        {"uid": user_uid}, {"$push": pushes, "$inc": {"schedule_rev": 1}}
+    )
+
+
+def pull_schedule(user_uid: str, docs: List[dict]):
+    pulls = {}
+    for doc in docs:
+        pulls.setdefault(f"schedule.{doc['day']}", {"appointment_id": {"$in": []}})
+        pulls[f"schedule.{doc['day']}"]["appointment_id"]["$in"].append(str(doc["_id"]))
+    User._get_collection().update_one(
+        {"uid": user_uid}, {"$pull": pulls, "$inc": {"schedule_rev": 1}}
+    )
+
+
+def read_schedule(user_uid: str, today: str) -> Tuple[Dict[str, List[Dict]], List[str]]:
+    """Read-only: (days from `today` on, non-empty only; the stored days that are past or empty)."""
+    row = User._get_collection().find_one(
+        {"uid": user_uid}, projection={"_id": 0, "schedule": 1}
+    ) or {}
+    schedule = row.get("schedule") or {}
+    stale = [day for day, entries in schedule.items() if day < today or not entries]
+    return {day: schedule[day] for day in sorted(schedule) if day not in stale}, stale
+
+
+def load_schedule(user_uid: str, today: str) -> Dict[str, List[Dict]]:
+    """read_schedule() for the serving path: past days are dropped from the document on the way."""
+    schedule, stale = read_schedule(user_uid, today)
+    if stale:
+        # without touching schedule_rev: dropping past days cannot conflict with a rebuild
+        User._get_collection().update_one(
+            {"uid": user_uid}, {"$unset": {f"schedule.{day}": "" for day in stale}}
+        )
+    return schedule
+
+
+def _view_from_appointments(user_uid: str, today: str):
+    since = datetime.strptime(today, "%Y-%m-%d")
+    docs = list(Appointment._get_collection().find({"user_uid": user_uid, "start": {"$gte": since}}))
+    return build_schedule(docs)
+
+
+def rebuild_schedule(user_uid: str, today: str) -> bool:
+    """Recompute the view from the appointments; False if a concurrent update won (retry later)."""
+    rev = (User._get_collection().find_one({"uid": user_uid}, projection={"schedule_rev": 1}) or {}).get("schedule_rev", 0)
+    view = _view_from_appointments(user_uid, today)
+    guard = {"uid": user_uid, "schedule_rev": rev} if rev else {
+        "uid": user_uid, "schedule_rev": {"$in": [0, None]},
+    }
+    result = User._get_collection().update_one(
+        guard, {"$set": {"schedule": view}, "$inc": {"schedule_rev": 1}}
+    )
+    return bool(result.matched_count)
+
+
+def verify_schedule(user_uid: str, today: str, repair: bool = False) -> bool:
+    """Compare the stored view (from `today`) with the appointments behind it; writes only with `repair`."""
+    expected = _view_from_appointments(user_uid, today)
+    stored, _ = read_schedule(user_uid, today)
+    if stored == expected:
+        return True
+    log.warning("Schedule view of %s is out of step with its appointments", user_uid)
+    if repair:
+        rebuild_schedule(user_uid, today)
+    return False
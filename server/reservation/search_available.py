@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime, timedelta
+import os
+from auth.dependencies import AuthContext, require_auth
+from reservation.availability_index import availability_index
+from reservation.slots import DAY_FORMAT, SLOT_MINUTES, interval_mask, iter_days, slot_time
+
+router = APIRouter()
+
+try:
+    SEARCH_MAX_RANGE_DAYS = int(os.environ.get("SEARCH_MAX_RANGE_DAYS", "14"))
+except ValueError:
+    SEARCH_MAX_RANGE_DAYS = 14
+
+SEARCH_MAX_RESULTS = 100
+
+class SearchAvailableRequest(BaseModel):
+    uid: str
+    token: str
+    tag: str
+    from_day: str = Field(..., description="YYYY-MM-DD")
+    to_day: Optional[str] = Field(None, description="YYYY-MM-DD, defaults to from_day")
+    start: str = Field("00:00", description="HH:MM, daily window start")
+    end: str = Field("24:00", description="HH:MM, daily window end")
+    min_minutes: int = SLOT_MINUTES
+    limit: int = 20
+
+@router.post("/search_available")
+async def search_available(data: SearchAvailableRequest, auth: AuthContext = Depends(require_auth)):
+    try:
+        first = datetime.strptime(data.from_day, DAY_FORMAT).date()
+        last = datetime.strptime(data.to_day or data.from_day, DAY_FORMAT).date()
+        window = interval_mask(data.start, data.end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or time format")
+
+    if last < first or last - first > timedelta(days=SEARCH_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range must be 1 to {SEARCH_MAX_RANGE_DAYS + 1} days")
+    if not window:
+        raise HTTPException(status_code=400, detail="Empty time window")
+    if data.min_minutes <= 0:
+        raise HTTPException(status_code=400, detail="min_minutes must be positive")
+
+    # تعداد بازه‌های ۳۰ دقیقه‌ای لازم (رو به بالا)؛ بیشتر از طول بازه‌ی روزانه هیچ نتیجه‌ای ندارد
+    slots = -(-data.min_minutes // SLOT_MINUTES)
+    if slots > bin(window).count("1"):
+        raise HTTPException(status_code=400, detail="min_minutes is longer than the daily time window")
+    limit = max(1, min(data.limit, SEARCH_MAX_RESULTS))
+
+    await availability_index.ensure_fresh()
+    matches = availability_index.search(data.tag, list(iter_days(first, last)), window, slots, limit)
+
+    return {
+        "results": [
+            {
+                "uid": entry.uid,
+                "fname": entry.fname,
+                "lname": entry.lname,
+                "first_free": {"day": day, "start": slot_time(run[0]), "end": slot_time(run[1])},
+            }
+            for entry, day, run in matches
+        ]
+    }
@@ -1,21 +1,24 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal
 from datetime import datetime, timedelta
+import logging
 import os
-import jwt
-from mongoengine import connect
-from database.database import Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.slots import DAY_FORMAT, intervals_to_day_masks, parse_day
+from reservation.availability import update_availability
+from reservation.availability_index import availability_index
+from reservation.availability_feed import availability_feed
 
+log = logging.getLogger(__name__)
 router = APIRouter()
 
-MONGO_URI = os.environ.get("MONGO_URI")
-JWT_SECRET = os.environ.get("GUIDORA_JWT_SECRET")
-
-if not MONGO_URI or not JWT_SECRET:
-    raise RuntimeError("Environment variables are not set!")
-
-connect(host=MONGO_URI)
+# استثناهای دورتر از این تعداد روز پذیرفته نمی‌شوند
+try:
+    AVAILABILITY_MAX_DAYS_AHEAD = int(os.environ.get("AVAILABILITY_MAX_DAYS_AHEAD", "365"))
+except ValueError:
+    AVAILABILITY_MAX_DAYS_AHEAD = 365
 
 class SlotItem(BaseModel):
     day: str
@@ -26,58 +29,57 @@ class AvailabilityRequest(BaseModel):
     uid: str
     token: str
     slots: List[SlotItem]
-
-def verify_jwt_and_uid(token: str, request_uid: str):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        if str(payload.get("uid")) != str(request_uid):
-            return False
-        return True
-    except:
-        return False
+    # روزهایی که برنامه‌ی هفتگی در آن‌ها اعمال نمی‌شود (تعطیل)
+    days_off: List[str] = []
+    # replace: کل استثناها با همین لیست جایگزین می‌شود
+    # add / remove: بازه‌ها به وضعیت فعلی هر روز اضافه / از آن کم می‌شوند
+    mode: Literal["replace", "add", "remove"] = "replace"
 
 @router.post("/set_spe_avi_slots")
-async def set_availability(data: AvailabilityRequest):
+async def set_availability(data: AvailabilityRequest, auth: AuthContext = Depends(require_auth)):
     # ۱. تایید هویت
-    clean_uid = data.uid.strip()
-    if not verify_jwt_and_uid(data.token, clean_uid):
-        raise HTTPException(status_code=401, detail="Authentication failed")
+    clean_uid = auth.uid
 
-    # ۲. پیدا کردن مشاور
-    specialist = Specialties.objects(uid=clean_uid).first()
-    if not specialist:
-        raise HTTPException(status_code=404, detail="Specialist not found")
-
-    # ۳. تولید اسلات‌ها
-    generated_chunks = []
+    # ۲. تولید بیت‌مپ روزانه (هر بیت = ۳۰ دقیقه)
+    day_masks = {}
     for s in data.slots:
         try:
-            # پارس کردن تاریخ و زمان (بدون درگیری با Timezone برای سادگی)
-            day_parts = list(map(int, s.day.split("-")))
-            sh, sm = map(int, s.start.split(":"))
-            eh, em = map(int, s.end.split(":"))
-
-            start_dt = datetime(day_parts[0], day_parts[1], day_parts[2], sh, sm)
-            end_dt = datetime(day_parts[0], day_parts[1], day_parts[2], eh, em)
-
-            curr = start_dt
-            while curr < end_dt:
-                # فرمت: 2025-12-28T08:00Z
-                iso_string = curr.strftime("%Y-%m-%dT%H:%MZ")
-                generated_chunks.append(iso_string)
-                curr += timedelta(minutes=30)
+            for day, mask in intervals_to_day_masks([(s.day, s.start, s.end)]).items():
+                day_masks[day] = day_masks.get(day, 0) | mask
         except Exception as e:
-            print(f"Error processing slot item: {e}")
+            log.warning("Skipping invalid slot item %s of %s: %s", s.model_dump(), clean_uid, e)
             continue
 
-    if not generated_chunks:
+    days_off = []
+    for day in data.days_off:
+        try:
+            days_off.append(parse_day(day))
+        except ValueError as e:
+            log.warning("Skipping invalid day off %r of %s: %s", day, clean_uid, e)
+
+    if not day_masks and not days_off:
         raise HTTPException(status_code=400, detail="Could not generate any time slots")
 
-    # ۴. ذخیره در دیتابیس
-    unique_chunks = list(dict.fromkeys(generated_chunks))
+    last_day = (datetime.utcnow() + timedelta(days=AVAILABILITY_MAX_DAYS_AHEAD)).strftime(DAY_FORMAT)
+    if max([*day_masks, *days_off]) > last_day:
+        raise HTTPException(
+            status_code=400, detail=f"Days must be at most {AVAILABILITY_MAX_DAYS_AHEAD} days ahead"
+        )
+
+    # ۳. ذخیره در دیتابیس: فقط روزهایی که تغییر کرده‌اند نوشته می‌شوند
+    # (رزروهای ثبت‌شده در booked دست نمی‌خورند)
     try:
-        # پاکسازی اسلات‌های قبلی و جایگزینی با جدید
-        specialist.update(set__available_slots=unique_chunks)
-        return {"status": "success", "count": len(unique_chunks)}
+        result = await run_db(update_availability, clean_uid, day_masks, data.mode, days_off)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="Specialist not found")
+    if result["conflict"]:
+        raise HTTPException(status_code=409, detail="Availability changed concurrently, retry")
+
+    if result["changed"]:
+        availability_index.mark_dirty(clean_uid)
+        availability_feed.notify(clean_uid)
+    count = sum(bin(mask).count("1") for mask in day_masks.values())
+    return {"status": "success", "count": count, "changed_days": result["changed"]}
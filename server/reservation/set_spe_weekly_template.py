@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from typing import List
+from database.database import Specialties
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.slots import template_to_masks
+from reservation.availability_index import availability_index
+from reservation.availability_feed import availability_feed
+
+router = APIRouter()
+
+class TemplateItem(BaseModel):
+    weekday: int = Field(..., description="0 = Monday ... 6 = Sunday")
+    start: str = Field(..., description="HH:MM")
+    end: str = Field(..., description="HH:MM")
+
+class WeeklyTemplateRequest(BaseModel):
+    uid: str
+    token: str
+    template: List[TemplateItem]
+
+@router.post("/set_spe_weekly_template")
+async def set_weekly_template(data: WeeklyTemplateRequest, auth: AuthContext = Depends(require_auth)):
+    try:
+        masks = template_to_masks((t.weekday, t.start, t.end) for t in data.template)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # برنامه‌ی هفتگی فقط ۷ عدد است؛ روزهای خاص در availability جداگانه نگه داشته می‌شوند
+    try:
+        updated = await run_db(
+            Specialties.objects(uid=auth.uid).update_one,
+            set__weekly_template=masks
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if not updated:
+        raise HTTPException(status_code=404, detail="Specialist not found")
+
+    availability_index.mark_dirty(auth.uid)
+    availability_feed.notify(auth.uid)
+    return {"status": "success", "weekdays": sorted(masks)}
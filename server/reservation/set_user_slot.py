@@ -1,22 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from typing import List
-from datetime import datetime, timedelta, timezone
-import os
-import jwt
-from mongoengine import connect
-from database.database import Specialties, User
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth
+from reservation.booking import book_slots
+from reservation.slots import intervals_to_day_masks
+from reservation.availability_index import availability_index
+from reservation.availability_feed import availability_feed
 
 router = APIRouter()
 
-MONGO_URI = os.environ.get("MONGO_URI")
-JWT_SECRET = os.environ.get("GUIDORA_JWT_SECRET")
-
-if not MONGO_URI or not JWT_SECRET:
-    raise RuntimeError("Environment variables are not set!")
-
-connect(host=MONGO_URI)
-
 class BookingSlot(BaseModel):
     day: str = Field(..., description="YYYY-MM-DD")
     start: str = Field(..., description="HH:MM")
@@ -29,70 +22,36 @@ class ReservationRequest(BaseModel):
     lname: str
     slots: List[BookingSlot]
 
-def verify_jwt_and_uid(token: str, request_uid: str):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        token_uid = payload.get("uid")
-        if not token_uid or token_uid != request_uid:
-            raise HTTPException(status_code=401, detail="Token UID mismatch")
-        return payload
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-def generate_iso_chunks(day_str, start_str, end_str):
-    day = datetime.strptime(day_str, "%Y-%m-%d")
-    sh, sm = map(int, start_str.split(":"))
-    eh, em = map(int, end_str.split(":"))
-    start_dt = datetime(day.year, day.month, day.day, sh, sm, tzinfo=timezone.utc)
-    end_dt = datetime(day.year, day.month, day.day, eh, em, tzinfo=timezone.utc)
-    chunks = []
-    cur = start_dt
-    while cur < end_dt:
-        iso = cur.strftime("%Y-%m-%dT%H:%MZ") 
-        chunks.append(iso)
-        cur += timedelta(minutes=30)
-    return chunks
-
 @router.post("/set_user_slot")
-async def set_user_slot(data: ReservationRequest):
-    verify_jwt_and_uid(data.token, data.uid)
-    current_user = User.objects(uid=data.uid).first()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    specialist = Specialties.objects(
-        fname=data.fname.lower(), 
-        lname=data.lname.lower()
-    ).first()
-    
-    if not specialist:
-        raise HTTPException(status_code=404, detail="Specialist not found")
-
-    all_requested_chunks = []
+async def set_user_slot(data: ReservationRequest, auth: AuthContext = Depends(require_auth)):
     try:
-        for s in data.slots:
-            chunks = generate_iso_chunks(s.day, s.start, s.end)
-            all_requested_chunks.extend(chunks)
+        day_masks = intervals_to_day_masks((s.day, s.start, s.end) for s in data.slots)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid date or time format")
 
-    available_set = set(specialist.available_slots)
-    to_be_booked = [chunk for chunk in all_requested_chunks if chunk in available_set]
-
-    if not to_be_booked or len(to_be_booked) != len(all_requested_chunks):
+    if not day_masks:
         raise HTTPException(status_code=400, detail="این زمان رزرو شده!  زمان دیگری را انتخاب کنید")
 
+    # رزرو اتمیک: اسلات‌ها فقط در صورتی برداشته می‌شوند که همه هنوز آزاد باشند
     try:
-        specialist.update(pull_all__available_slots=to_be_booked)
-
-        current_user.update(
-            set__appointments=to_be_booked,
-            set__last_specialist_uid=specialist.uid,
-            set__reserved_specialist_fname=specialist.fname,
-            set__reserved_specialist_lname=specialist.lname,
-            set__reserved_specialist_number=specialist.number
+        result = await run_db(
+            book_slots, data.uid, data.fname.lower(), data.lname.lower(), day_masks
         )
     except Exception:
         raise HTTPException(status_code=500, detail="Database update failed")
 
-    return {"status": "success", "reserved_count": len(to_be_booked)}
\ No newline at end of file
+    if result["status"] == "no_specialist":
+        raise HTTPException(status_code=404, detail="Specialist not found")
+    if result["status"] == "no_user":
+        raise HTTPException(status_code=404, detail="User not found")
+    if result["status"] == "taken":
+        raise HTTPException(status_code=400, detail="این زمان رزرو شده!  زمان دیگری را انتخاب کنید")
+
+    availability_index.mark_dirty(result["specialist"]["uid"])
+    availability_feed.notify(result["specialist"]["uid"])
+    return {
+        "status": "success",
+        "reserved_count": sum(bin(mask).count("1") for mask in day_masks.values()),
+        "booking_id": result["booking_id"],
+        "appointment_ids": [str(doc["_id"]) for doc in result["appointments"]],
+    }
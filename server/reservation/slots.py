@@ -0,0 +1,256 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson.int64 import Int64
+
+# هر روز = ۴۸ بیت، هر بیت یک بازه‌ی ۳۰ دقیقه‌ای (بیت ۰ = 00:00 تا 00:30)
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def parse_day(day: str) -> str:
+    """Validate YYYY-MM-DD and return it normalized (used as the map key)."""
+    return datetime.strptime(day.strip(), DAY_FORMAT).strftime(DAY_FORMAT)
+
+
+def slot_index(hhmm: str) -> int:
+    h, m = map(int, hhmm.strip().split(":"))
+    if not (0 <= h <= 24 and 0 <= m < 60) or (h == 24 and m):
+        raise ValueError(f"invalid time {hhmm!r}")
+    if m % SLOT_MINUTES:
+        raise ValueError(f"time {hhmm!r} is not on a {SLOT_MINUTES}-minute boundary")
+    return (h * 60 + m) // SLOT_MINUTES
+
+
+def interval_mask(start: str, end: str) -> int:
+    """Bits for the half-open interval [start, end) within one day."""
+    s, e = slot_index(start), slot_index(end)
+    if e <= s:
+        return 0
+    return ((1 << (e - s)) - 1) << s
+
+
+def intervals_to_day_masks(items: Iterable[Tuple[str, str, str]]) -> Dict[str, int]:
+    """(day, start, end) triples -> {day: mask}; overlapping intervals are OR-ed."""
+    masks: Dict[str, int] = {}
+    for day, start, end in items:
+        mask = interval_mask(start, end)
+        if mask:
+            key = parse_day(day)
+            masks[key] = masks.get(key, 0) | mask
+    return masks
+
+
+def slot_time(index: int) -> str:
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def mask_runs(mask: int) -> List[Tuple[int, int]]:
+    """Contiguous runs of set bits as half-open (first, last + 1) slot indexes."""
+    runs = []
+    i = 0
+    while mask >> i:
+        if (mask >> i) & 1:
+            j = i
+            while (mask >> j) & 1:
+                j += 1
+            runs.append((i, j))
+            i = j
+        else:
+            i += 1
+    return runs
+
+
+def mask_to_intervals(mask: int) -> List[Tuple[str, str]]:
+    """Contiguous runs of set bits as ("HH:MM", "HH:MM") pairs."""
+    return [(slot_time(i), slot_time(j)) for i, j in mask_runs(mask)]
+
+
+def run_mask(first: int, end: int) -> int:
+    return ((1 << (end - first)) - 1) << first
+
+
+def slot_datetime(day: str, index: int) -> datetime:
+    """Naive UTC start of slot `index` on `day` (index 48 = next midnight)."""
+    return datetime.strptime(day, DAY_FORMAT) + timedelta(minutes=index * SLOT_MINUTES)
+
+
+def iso_to_day_masks(iso_slots: Iterable[str]) -> Dict[str, int]:
+    """Legacy `2025-12-28T08:00Z` chunk strings -> {day: mask}."""
+    masks: Dict[str, int] = {}
+    for s in iso_slots:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+        if dt.minute % SLOT_MINUTES:
+            continue
+        key = dt.strftime(DAY_FORMAT)
+        masks[key] = masks.get(key, 0) | (1 << ((dt.hour * 60 + dt.minute) // SLOT_MINUTES))
+    return masks
+
+
+def day_masks_to_iso(masks: Dict[str, int]) -> List[str]:
+    """{day: mask} -> sorted legacy chunk strings."""
+    out = []
+    for day in sorted(masks):
+        base = datetime.strptime(day, DAY_FORMAT)
+        mask = masks[day]
+        for i in range(SLOTS_PER_DAY):
+            if (mask >> i) & 1:
+                out.append((base + timedelta(minutes=i * SLOT_MINUTES)).strftime("%Y-%m-%dT%H:%MZ"))
+    return out
+
+
+def weekday_key(day: str) -> str:
+    """Template key for a day: "0" (Monday) ... "6" (Sunday)."""
+    return str(datetime.strptime(day, DAY_FORMAT).weekday())
+
+
+def iter_days(start: date, end: date) -> Iterable[str]:
+    """Days in [start, end] as map keys."""
+    d = start
+    while d <= end:
+        yield d.strftime(DAY_FORMAT)
+        d += timedelta(days=1)
+
+
+def base_mask(day: str, availability: Dict[str, int], template: Dict[str, int]) -> int:
+    """A date-specific exception wins over the weekly template (0 = day off)."""
+    if availability and day in availability:
+        return availability[day]
+    return (template or {}).get(weekday_key(day), 0)
+
+
+def free_masks(
+    availability: Dict[str, int],
+    booked: Dict[str, int],
+    template: Dict[str, int] = None,
+    start: date = None,
+    end: date = None,
+) -> Dict[str, int]:
+    """
+    Free bits per day within [start, end] (either bound optional).
+    The template repeats forever, so template days are only expanded when
+    both bounds are given.
+    """
+    days = set(availability or {})
+    if template and start and end:
+        days.update(iter_days(start, end))
+
+    free = {}
+    for day in sorted(days):
+        if start and day < start.strftime(DAY_FORMAT):
+            continue
+        if end and day > end.strftime(DAY_FORMAT):
+            continue
+        m = base_mask(day, availability, template) & ~(booked or {}).get(day, 0)
+        if m:
+            free[day] = m
+    return free
+
+
+def claim_filter(day_masks: Dict[str, int]) -> dict:
+    """Mongo filter: every requested bit is available and not yet booked."""
+    clauses = []
+    for day, mask in day_masks.items():
+        m = Int64(mask)
+        clauses.append({"$or": [
+            {f"availability.{day}": {"$bitsAllSet": m}},
+            {
+                f"availability.{day}": {"$exists": False},
+                f"weekly_template.{weekday_key(day)}": {"$bitsAllSet": m},
+            },
+        ]})
+        clauses.append({"$or": [
+            {f"booked.{day}": {"$exists": False}},
+            {f"booked.{day}": {"$bitsAllClear": m}},
+        ]})
+    return {"$and": clauses}
+
+
+def book_update(day_masks: Dict[str, int]) -> dict:
+    return {"$bit": {f"booked.{day}": {"or": Int64(mask)} for day, mask in day_masks.items()}}
+
+
+def template_to_masks(items: Iterable[Tuple[int, str, str]]) -> Dict[str, int]:
+    """(weekday, start, end) triples -> {"0".."6": mask}."""
+    masks: Dict[str, int] = {}
+    for weekday, start, end in items:
+        if not 0 <= int(weekday) <= 6:
+            raise ValueError(f"invalid weekday {weekday!r}")
+        mask = interval_mask(start, end)
+        if mask:
+            key = str(int(weekday))
+            masks[key] = masks.get(key, 0) | mask
+    return masks
+
+
+def release_update(day_masks: Dict[str, int]) -> dict:
+    return {"$bit": {f"booked.{day}": {"and": Int64(FULL_DAY ^ mask)} for day, mask in day_masks.items()}}
+
+
+def availability_changes(
+    availability: Dict[str, int],
+    template: Dict[str, int],
+    day_masks: Dict[str, int],
+    mode: str,
+    days_off: Iterable[str] = (),
+) -> Dict[str, Optional[int]]:
+    """
+    Date exceptions that differ after applying `day_masks` ({day: new exception},
+    None = drop the exception and fall back to the template).
+    replace: the submitted days become the whole exception map.
+    add / remove: OR / clear the bits on top of what the day currently offers.
+    """
+    availability = availability or {}
+    if mode == "replace":
+        target = dict(day_masks)
+        target.update({day: 0 for day in days_off})
+        changes = {day: mask for day, mask in target.items() if availability.get(day) != mask}
+        changes.update({day: None for day in availability if day not in target})
+        return changes
+
+    changes: Dict[str, Optional[int]] = {}
+    for day, mask in day_masks.items():
+        base = base_mask(day, availability, template)
+        new = base | mask if mode == "add" else base & ~mask
+        if availability.get(day) != new:
+            changes[day] = new
+    for day in days_off:
+        if availability.get(day) != 0:
+            changes[day] = 0
+    return changes
+
+
+def exception_update(changes: Dict[str, Optional[int]]) -> dict:
+    update = {}
+    to_set = {f"availability.{day}": Int64(mask) for day, mask in changes.items() if mask is not None}
+    to_unset = {f"availability.{day}": "" for day, mask in changes.items() if mask is None}
+    if to_set:
+        update["$set"] = to_set
+    if to_unset:
+        update["$unset"] = to_unset
+    return update
+
+
+def exception_guard(availability: Dict[str, int], days: Iterable[str]) -> dict:
+    """Filter matching only while the touched days still hold the values the diff was based on."""
+    guard = {}
+    for day in days:
+        if availability and day in availability:
+            guard[f"availability.{day}"] = Int64(availability[day])
+        else:
+            guard[f"availability.{day}"] = {"$exists": False}
+    return guard
+
+
+def consolidate_intervals(intervals: Iterable[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Sort (start, end) pairs and merge the ones that touch or overlap."""
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import os
+from database.database import User
+from database.aio import run_db
+from auth.dependencies import AuthContext, require_auth, resolve_role
+from auth.identity import ROLE_SPECIALIST
+from reservation.booking import specialist_appointments
+from reservation.slots import DAY_FORMAT, consolidate_intervals
+
+router = APIRouter()
+
+try:
+    AGENDA_MAX_RANGE_DAYS = int(os.environ.get("AGENDA_MAX_RANGE_DAYS", "62"))
+except ValueError:
+    AGENDA_MAX_RANGE_DAYS = 62
+
+try:
+    AGENDA_PAGE_SIZE = int(os.environ.get("AGENDA_PAGE_SIZE", "100"))
+except ValueError:
+    AGENDA_PAGE_SIZE = 100
+
+AGENDA_MAX_PAGE_SIZE = 500
+CLIENT_FIELDS = ("uid", "fname", "lname", "number")
+
+class AgendaRequest(BaseModel):
+    uid: str
+    token: str
+    from_day: str = Field(..., description="YYYY-MM-DD")
+    to_day: str = Field(..., description="YYYY-MM-DD")
+    cursor: Optional[str] = None
+    limit: Optional[int] = None
+
+def load_clients(uids: List[str]) -> Dict[str, dict]:
+    rows = User.objects(uid__in=uids).only(*CLIENT_FIELDS).as_pymongo()
+    return {row["uid"]: {f: row.get(f) for f in CLIENT_FIELDS} for row in rows}
+
+def group_agenda(docs: List[dict], clients: Dict[str, dict]) -> Dict[str, List[Dict]]:
+    """day -> each client's appointments with adjacent chunks merged into intervals."""
+    per_client: Dict[tuple, List[dict]] = {}
+    for doc in docs:
+        per_client.setdefault((doc["day"], doc["user_uid"]), []).append(doc)
+
+    entries = []
+    for (day, user_uid), items in per_client.items():
+        for start, end in consolidate_intervals((d["start"], d["end"]) for d in items):
+            entries.append((day, start, {
+                "start": start.strftime("%H:%M"),
+                "end": "24:00" if end.date() > start.date() else end.strftime("%H:%M"),
+                "client": clients.get(user_uid, {"uid": user_uid}),
+                "appointment_ids": [str(d["_id"]) for d in items if start <= d["start"] < end],
+            }))
+
+    agenda: Dict[str, List[Dict]] = {}
+    for day, _, entry in sorted(entries, key=lambda e: e[1]):
+        agenda.setdefault(day, []).append(entry)
+    return agenda
+
+@router.post("/specialist_agenda")
+async def specialist_agenda(data: AgendaRequest, auth: AuthContext = Depends(require_auth)):
+    if await resolve_role(auth) != ROLE_SPECIALIST:
+        raise HTTPException(status_code=403, detail="Only specialists have an agenda")
+
+    try:
+        first = datetime.strptime(data.from_day, DAY_FORMAT)
+        last = datetime.strptime(data.to_day, DAY_FORMAT)
+        after = datetime.fromisoformat(data.cursor) if data.cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or cursor format")
+
+    if last < first or last - first > timedelta(days=AGENDA_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range must be 1 to {AGENDA_MAX_RANGE_DAYS + 1} days")
+
+    limit = max(1, min(data.limit or AGENDA_PAGE_SIZE, AGENDA_MAX_PAGE_SIZE))
+    # یک رکورد اضافه برای اینکه بدانیم صفحه‌ی بعدی وجود دارد یا نه
+    docs = await run_db(
+        specialist_appointments, auth.uid, first, last + timedelta(days=1), limit + 1, after
+    )
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = docs[-1]["start"].isoformat()
+
+    clients = await run_db(load_clients, list({d["user_uid"] for d in docs})) if docs else {}
+    return {
+        "specialist_uid": auth.uid,
+        "days": group_agenda(docs, clients),
+        "next_cursor": next_cursor,
+    }
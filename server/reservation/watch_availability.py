@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+import asyncio
+import os
+from auth.dependencies import require_admin, verify_token
+from reservation.availability_feed import Subscription, availability_feed
+
+router = APIRouter()
+
+try:
+    WATCH_MAX_SUBSCRIBERS = int(os.environ.get("WATCH_MAX_SUBSCRIBERS", "20000"))
+except ValueError:
+    WATCH_MAX_SUBSCRIBERS = 20000
+
+# مهلت ارسال اولین پیام (uid، token و specialist_uid) بعد از اتصال
+WATCH_HELLO_TIMEOUT = 10
+
+# کدهای بستن WebSocket
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+async def _send_updates(websocket: WebSocket, sub: Subscription):
+    try:
+        while True:
+            await websocket.send_json(await sub.get())
+    except WebSocketDisconnect:
+        pass
+
+
+async def _read_until_closed(websocket: WebSocket):
+    # کلاینت فقط ping می‌فرستد؛ خواندن برای فهمیدن قطع اتصال است
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+# به جای poll کردن get_spe_info: اول snapshot اسلات‌های آزاد متخصص، بعد فقط روزهایی که تغییر کرده‌اند
+@router.websocket("/watch_availability")
+async def watch_availability(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        hello = await asyncio.wait_for(websocket.receive_json(), WATCH_HELLO_TIMEOUT)
+        uid = str(hello.get("uid") or "").strip()
+        token = str(hello.get("token") or hello.get("jwt") or "").strip()
+        specialist_uid = str(hello.get("specialist_uid") or "").strip()
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, ValueError, AttributeError):
+        await websocket.close(code=CLOSE_POLICY_VIOLATION, reason="Expected uid, token and specialist_uid")
+        return
+
+    try:
+        await verify_token(uid, token)
+    except HTTPException as e:
+        await websocket.close(code=CLOSE_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    if not specialist_uid:
+        await websocket.close(code=CLOSE_POLICY_VIOLATION, reason="specialist_uid is required")
+        return
+    if availability_feed.subscribers >= WATCH_MAX_SUBSCRIBERS:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason="Too many watchers")
+        return
+
+    sub = await availability_feed.subscribe(specialist_uid)
+    if sub is None:
+        await websocket.close(code=CLOSE_POLICY_VIOLATION, reason="Specialist not found")
+        return
+
+    tasks = [
+        asyncio.create_task(_send_updates(websocket, sub)),
+        asyncio.create_task(_read_until_closed(websocket)),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        availability_feed.unsubscribe(sub)
+        for task in tasks:
+            task.cancel()
+
+
+@router.get("/availability_feed_stats", dependencies=[Depends(require_admin)])
+async def availability_feed_stats():
+    return availability_feed.stats()
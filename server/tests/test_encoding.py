@@ -0,0 +1,66 @@
+import json
+
+import msgpack
+import pytest
+from starlette.requests import Request
+
+import encoding
+from encoding import JSON, MSGPACK, Encoded, encode, encode_map, negotiate, negotiated_response
+
+CONTENT = {
+    "specialists": [{"uid": "s1", "fname": "مریم", "tag": ["law"]}, {"uid": "s2", "fname": "sara", "tag": []}],
+    "next_cursor": None,
+    "total": 2,
+}
+
+
+def request(accept: str = None) -> Request:
+    headers = [(b"accept", accept.encode())] if accept is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize("accept, fmt", [
+    (None, JSON),
+    ("application/json", JSON),
+    ("application/msgpack", MSGPACK),
+    ("application/json, application/x-msgpack;q=0.9", MSGPACK),
+    ("application/msgpack;q=0", JSON),
+    ("application/msgpack;q=abc", JSON),
+])
+def test_negotiate(accept, fmt):
+    assert negotiate(request(accept)) == fmt
+
+
+def test_negotiate_without_msgpack(monkeypatch):
+    monkeypatch.setattr(encoding, "msgpack", None)
+    assert negotiate(request("application/msgpack")) == JSON
+
+
+def test_json_is_compact_and_keeps_unicode():
+    body = encode(JSON, {"fname": "مریم", "tag": ["a", "b"]})
+    assert body == '{"fname":"مریم","tag":["a","b"]}'.encode()
+
+
+@pytest.mark.parametrize("fmt, decode", [(JSON, json.loads), (MSGPACK, msgpack.unpackb)])
+def test_encode_map_matches_plain_encoding(fmt, decode):
+    assert decode(encode_map(fmt, CONTENT)) == CONTENT
+
+
+@pytest.mark.parametrize("fmt, decode", [(JSON, json.loads), (MSGPACK, msgpack.unpackb)])
+def test_encode_map_splices_encoded_fragments(fmt, decode):
+    fragment = Encoded(encode(fmt, CONTENT["specialists"]))
+    body = encode_map(fmt, dict(CONTENT, specialists=fragment))
+    assert decode(body) == CONTENT
+
+
+@pytest.mark.parametrize("fmt, decode", [(JSON, json.loads), (MSGPACK, msgpack.unpackb)])
+def test_encode_map_empty(fmt, decode):
+    assert decode(encode_map(fmt, {})) == {}
+
+
+def test_negotiated_response_headers():
+    response = negotiated_response(request("application/msgpack"), {"ok": True}, status_code=201)
+    assert response.status_code == 201
+    assert response.media_type == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    assert msgpack.unpackb(response.body) == {"ok": True}
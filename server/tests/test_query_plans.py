@@ -0,0 +1,35 @@
+"""
+The database.check_query_plans checks as tests. They need a scratch mongod:
+
+    GUIDORA_TEST_MONGO_URI=mongodb://localhost/guidora_test python -m pytest tests/test_query_plans.py
+"""
+import os
+
+import pytest
+
+from database import connection
+from database.check_query_plans import QUERIES, seed, unseed, winning_stages
+
+TEST_MONGO_URI = os.environ.get("GUIDORA_TEST_MONGO_URI")
+
+pytestmark = pytest.mark.skipif(not TEST_MONGO_URI, reason="GUIDORA_TEST_MONGO_URI is not set")
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(connection, "MONGO_URI", TEST_MONGO_URI)
+        connection.mongo.connect()
+        connection.mongo.ensure_indexes()
+        seed()
+        try:
+            yield
+        finally:
+            unseed()
+            connection.mongo.stop()
+
+
+@pytest.mark.parametrize("name, model, query, sort", QUERIES, ids=[q[0] for q in QUERIES])
+def test_query_uses_an_index(seeded_db, name, model, query, sort):
+    stages = winning_stages(model, query, sort)
+    assert "COLLSCAN" not in stages, " <- ".join(stages)
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from refreshing_index import RefreshingIndex
+
+
+class DictIndex(RefreshingIndex):
+    """uid -> value copy of `db`; full scans wait on `scan_gate`."""
+
+    def __init__(self, db: dict):
+        super().__init__(max_age=60)
+        self.db = db
+        self.rows = {}
+        self.scan_gate = threading.Event()
+        self.scan_gate.set()
+
+    def fetch(self, uids=None):
+        if uids is None:
+            snapshot = dict(self.db)
+            self.scan_gate.wait(5)
+            return [{"uid": uid, "value": value} for uid, value in snapshot.items()]
+        return [{"uid": uid, "value": self.db[uid]} for uid in uids if uid in self.db]
+
+    def _reset(self):
+        self.rows = {}
+
+    def _put(self, row: dict):
+        self.rows[row["uid"]] = row["value"]
+
+    def _remove(self, uid: str):
+        self.rows.pop(uid, None)
+
+
+def test_first_lookup_builds_and_dirty_uids_are_reread():
+    db = {"a": 1, "b": 1}
+    index = DictIndex(db)
+
+    async def scenario():
+        await index.ensure_fresh()
+        assert index.rows == {"a": 1, "b": 1}
+        db["a"] = 2
+        del db["b"]
+        index.mark_dirty("a")
+        index.mark_dirty("b")
+        await index.ensure_fresh()
+
+    asyncio.run(scenario())
+    assert index.rows == {"a": 2}
+    assert index.age() is not None
+
+
+def test_refresh_during_rebuild_is_not_lost():
+    db = {"a": 1}
+    index = DictIndex(db)
+
+    async def scenario():
+        await index.ensure_fresh()
+        index.scan_gate.clear()
+        rebuild = index._start_rebuild()
+        await asyncio.sleep(0.05)  # the scan has read a == 1 and is waiting
+
+        db["a"] = 2
+        index.mark_dirty("a")
+        await index.ensure_fresh()
+        assert index.rows["a"] == 2
+
+        index.scan_gate.set()
+        await rebuild
+        # the scan's older row went in, but the uid is re-read on the next lookup
+        await index.ensure_fresh()
+
+    asyncio.run(scenario())
+    assert index.rows["a"] == 2
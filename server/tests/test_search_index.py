@@ -0,0 +1,95 @@
+import asyncio
+
+from home import search_index as search_module
+from home.search_index import NAME_WEIGHT, SpecialistSearchIndex, word_grams
+
+ROWS = [
+    {"uid": "s1", "fname": "maryam", "lname": "rezaei", "about": "family lawyer", "tag": ["law"], "token": "t"},
+    {"uid": "s2", "fname": "mohammad", "lname": "karimi", "about": "tax and family law", "tag": ["law", "tax"]},
+    {"uid": "s3", "fname": "sara", "lname": "ahmadi", "about": "maths teacher", "educert": "msc", "tag": ["edu"]},
+]
+
+
+def build(rows=ROWS) -> SpecialistSearchIndex:
+    index = SpecialistSearchIndex(max_age=60)
+    for row in rows:
+        index._put(row)
+    return index
+
+
+def uids(results):
+    return [r["uid"] for r in results]
+
+
+def test_word_grams():
+    assert word_grams("a") == {"$$a"}
+    assert word_grams("ab") == {"$ab"}
+    assert word_grams("sara") == {"$sa", "sar", "ara"}
+
+
+def test_prefix_and_typo():
+    index = build()
+    assert uids(index.search("mar", None, 10)) == ["s1"]
+    assert uids(index.search("mohamad", None, 10)) == ["s2"]
+    assert uids(index.search("m", None, 10)) == ["s1", "s2", "s3"]
+
+
+def test_every_word_must_match():
+    index = build()
+    assert uids(index.search("family maryam", None, 10)) == ["s1"]
+    assert index.search("family teacher", None, 10) == []
+
+
+def test_name_matches_rank_first():
+    index = build([
+        {"uid": "a", "fname": "ali", "lname": "x", "about": "karimi's partner"},
+        {"uid": "b", "fname": "karimi", "lname": "y", "about": ""},
+    ])
+    results = index.search("karimi", None, 10)
+    assert uids(results) == ["b", "a"]
+    assert results[0]["score"] == NAME_WEIGHT * results[1]["score"]
+
+
+def test_tag_filter_and_limit():
+    index = build()
+    assert uids(index.search("family", "LAW", 10)) == ["s1", "s2"]
+    assert uids(index.search("family", "tax", 10)) == ["s2"]
+    assert len(index.search("m", None, 2)) == 2
+
+
+def test_results_are_public_profiles():
+    result = build().search("maryam", None, 1)[0]
+    assert "token" not in result
+    assert result["about"] == "family lawyer"
+
+
+def test_put_replaces_and_remove_drops():
+    index = build()
+    index._put(dict(ROWS[0], fname="leila"))
+    assert index.search("maryam", None, 10) == []
+    assert uids(index.search("leila", None, 10)) == ["s1"]
+    index._remove("s1")
+    assert index.search("leila", None, 10) == []
+    assert index.stats()["specialists"] == 2
+
+
+def test_dirty_uid_is_reread(monkeypatch):
+    db = {row["uid"]: dict(row) for row in ROWS}
+
+    def fetch_rows(uids=None):
+        return [dict(db[uid]) for uid in (db if uids is None else uids) if uid in db]
+
+    monkeypatch.setattr(search_module, "fetch_rows", fetch_rows)
+    index = SpecialistSearchIndex(max_age=60)
+
+    async def scenario():
+        await index.ensure_fresh()
+        db["s3"]["fname"] = "zahra"
+        del db["s2"]
+        index.mark_dirty("s3")
+        index.mark_dirty("s2")
+        await index.ensure_fresh()
+
+    asyncio.run(scenario())
+    assert uids(index.search("zahra", None, 10)) == ["s3"]
+    assert index.search("mohammad", None, 10) == []
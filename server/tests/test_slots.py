@@ -0,0 +1,124 @@
+from datetime import date
+
+import pytest
+
+from reservation.slots import (
+    FULL_DAY,
+    SLOTS_PER_DAY,
+    availability_changes,
+    claim_filter,
+    day_masks_to_iso,
+    free_masks,
+    interval_mask,
+    intervals_to_day_masks,
+    iso_to_day_masks,
+    mask_runs,
+    mask_to_intervals,
+    release_update,
+    slot_index,
+    template_to_masks,
+)
+
+MONDAY = "2030-01-07"
+TUESDAY = "2030-01-08"
+
+
+def test_slot_index_bounds():
+    assert slot_index("00:00") == 0
+    assert slot_index("08:30") == 17
+    assert slot_index("24:00") == SLOTS_PER_DAY
+    for bad in ("08:15", "24:30", "25:00", "12:60"):
+        with pytest.raises(ValueError):
+            slot_index(bad)
+
+
+def test_interval_mask_is_half_open():
+    assert interval_mask("08:00", "09:00") == 0b11 << 16
+    assert interval_mask("00:00", "24:00") == FULL_DAY
+    assert interval_mask("09:00", "09:00") == 0
+    assert interval_mask("10:00", "09:00") == 0
+
+
+def test_intervals_or_overlaps_per_day():
+    masks = intervals_to_day_masks([
+        (MONDAY, "08:00", "09:00"),
+        (MONDAY, "08:30", "10:00"),
+        (TUESDAY, "10:00", "10:00"),
+    ])
+    assert masks == {MONDAY: interval_mask("08:00", "10:00")}
+
+
+def test_mask_runs_round_trip():
+    mask = interval_mask("08:00", "09:30") | interval_mask("12:00", "12:30") | interval_mask("23:30", "24:00")
+    assert mask_runs(mask) == [(16, 19), (24, 25), (47, 48)]
+    assert mask_to_intervals(mask) == [("08:00", "09:30"), ("12:00", "12:30"), ("23:30", "24:00")]
+    assert mask_runs(0) == []
+
+
+def test_iso_round_trip_skips_off_grid_chunks():
+    iso = ["2030-01-07T08:00Z", "2030-01-07T08:30Z", "2030-01-08T23:30Z"]
+    masks = iso_to_day_masks(iso + ["2030-01-07T09:10Z"])
+    assert masks == {MONDAY: 0b11 << 16, TUESDAY: 1 << 47}
+    assert day_masks_to_iso(masks) == iso
+
+
+def test_free_masks_exception_wins_over_template():
+    template = template_to_masks([(0, "08:00", "12:00"), (1, "08:00", "10:00")])
+    availability = {MONDAY: interval_mask("14:00", "16:00")}
+    booked = {TUESDAY: interval_mask("08:00", "09:00")}
+    free = free_masks(availability, booked, template, date(2030, 1, 7), date(2030, 1, 8))
+    assert free == {MONDAY: interval_mask("14:00", "16:00"), TUESDAY: interval_mask("09:00", "10:00")}
+
+
+def test_free_masks_day_off_and_bounds():
+    template = template_to_masks([(0, "08:00", "12:00")])
+    assert free_masks({MONDAY: 0}, {}, template, date(2030, 1, 7), date(2030, 1, 7)) == {}
+    # without both bounds the template is not expanded
+    assert free_masks({}, {}, template, date(2030, 1, 7)) == {}
+
+
+def test_release_clears_only_the_given_bits():
+    mask = interval_mask("08:00", "09:00")
+    update = release_update({MONDAY: mask})
+    assert int(update["$bit"][f"booked.{MONDAY}"]["and"]) == FULL_DAY & ~mask
+
+
+def test_claim_filter_covers_exception_and_template():
+    mask = interval_mask("08:00", "09:00")
+    clauses = claim_filter({MONDAY: mask})["$and"]
+    available, not_booked = clauses
+    assert {f"availability.{MONDAY}": {"$bitsAllSet": mask}} in available["$or"]
+    assert {
+        f"availability.{MONDAY}": {"$exists": False},
+        "weekly_template.0": {"$bitsAllSet": mask},
+    } in available["$or"]
+    assert {f"booked.{MONDAY}": {"$bitsAllClear": mask}} in not_booked["$or"]
+
+
+def test_availability_changes_modes():
+    template = template_to_masks([(0, "08:00", "12:00")])
+    morning = interval_mask("08:00", "09:00")
+    assert availability_changes({}, template, {MONDAY: morning}, "remove") == {
+        MONDAY: interval_mask("09:00", "12:00")
+    }
+    evening = interval_mask("18:00", "19:00")
+    assert availability_changes({}, template, {MONDAY: evening}, "add") == {
+        MONDAY: interval_mask("08:00", "12:00") | evening
+    }
+    assert availability_changes({MONDAY: morning}, template, {MONDAY: morning}, "add") == {}
+    assert availability_changes({TUESDAY: morning}, template, {MONDAY: morning}, "replace", [TUESDAY]) == {
+        MONDAY: morning,
+        TUESDAY: 0,
+    }
+    assert availability_changes({TUESDAY: morning}, template, {}, "replace") == {TUESDAY: None}
+
+
+def test_first_run_start():
+    from reservation.availability_index import first_run_start
+
+    mask = interval_mask("08:00", "09:00") | interval_mask("10:00", "12:00")
+    assert first_run_start(mask, 1) == 16
+    assert first_run_start(mask, 3) == 20
+    assert first_run_start(mask, 5) == -1
+    assert first_run_start(FULL_DAY, SLOTS_PER_DAY) == 0
+    assert first_run_start(FULL_DAY, 10 ** 9) == -1